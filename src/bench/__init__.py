@@ -0,0 +1,13 @@
+from bench.scenarios import Scenario, SCENARIOS, generate_map, build_game
+from bench.suite import run_benchmarks, compare_results, save_results, load_results
+
+__all__ = [
+    "Scenario",
+    "SCENARIOS",
+    "generate_map",
+    "build_game",
+    "run_benchmarks",
+    "compare_results",
+    "save_results",
+    "load_results",
+]
@@ -0,0 +1,137 @@
+"""基准测试用的合成地图与场景"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from config import COLOR, WALL, FLOOR, PLAYER
+from crafting import CraftingRecipe, Ingredient, RecipeManager
+from data import load_recipes
+from data.object_manager import object_manager
+from entities import Item, NPC
+from game import Game, GameState
+
+BENCH_NPC_ID = "bench_npc"
+BENCH_ITEM_ID = "bench_item"
+
+
+@dataclass
+class Scenario:
+    """一个合成基准场景"""
+    name: str
+    width: int
+    height: int
+    wall_density: float = 0.1  # 内部格子为墙的概率
+    door_density: float = 0.01  # 内部格子为门的概率
+    npcs: int = 0
+    items: int = 0
+    recipes: int = 200  # 额外生成的合成配方数量
+    seed: int = 1
+
+
+# 预设场景：从比屏幕还小的地图到 1000x1000 的分块世界
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("tiny", 20, 10, npcs=2, items=4, recipes=20),
+        Scenario("screen", 34, 15, npcs=8, items=16, recipes=100),
+        Scenario("medium", 200, 200, npcs=100, items=400),
+        Scenario("large", 1000, 1000, npcs=2000, items=8000, recipes=1000),
+        # More entities than floor cells: they stack, to measure saving and loading 100k entities
+        Scenario("crowd", 34, 15, npcs=1000, items=99000, recipes=20),
+    )
+}
+
+
+def generate_map(scenario: Scenario) -> List[str]:
+    """生成带外墙的随机地图，玩家位于中心"""
+    rng = np.random.default_rng(scenario.seed)
+    width, height = scenario.width, scenario.height
+    roll = rng.random((height, width))
+    grid = np.full((height, width), FLOOR)
+    grid[roll < scenario.wall_density + scenario.door_density] = "+"
+    grid[roll < scenario.wall_density] = WALL
+    grid[[0, -1], :] = WALL
+    grid[:, [0, -1]] = WALL
+    grid[height // 2, width // 2] = PLAYER
+    return ["".join(row) for row in grid]
+
+
+def register_bench_objects():
+    """注册场景中使用的NPC与物品原型（已注册时跳过）"""
+    if object_manager.get_object(BENCH_NPC_ID) is None:
+        object_manager.add_object(NPC(BENCH_NPC_ID, "Wanderer", "w", COLOR.DARK_GREEN))
+    if object_manager.get_object(BENCH_ITEM_ID) is None:
+        object_manager.add_object(Item(BENCH_ITEM_ID, "Trinket", "*", COLOR.SADDLE_BROWN))
+
+
+def free_cells(map_strings: List[str], count: int, rng: np.random.Generator) -> List[Tuple[int, int]]:
+    """随机挑选count个地板格；地板格不够时允许重复（实体叠放）"""
+    rows = np.array([list(row) for row in map_strings])
+    ys, xs = np.nonzero(rows == FLOOR)
+    picks = rng.choice(len(xs), size=count, replace=count > len(xs))
+    return [(int(xs[i]), int(ys[i])) for i in picks]
+
+
+def populate(game: Game, scenario: Scenario):
+    """在世界中随机放置NPC与物品"""
+    assert game.world is not None
+    register_bench_objects()
+    rng = np.random.default_rng(scenario.seed + 1)
+    cells = free_cells(game.map_data, scenario.npcs + scenario.items, rng)
+    npc_cells, item_cells = cells[:scenario.npcs], cells[scenario.npcs:]
+    world = game.world
+    chunked_world = world.chunked_world
+
+    # Actors keep the ids given here; items are numbered by the map
+    npc_records = [{"id": f"{BENCH_NPC_ID}_{i}", "object_data": BENCH_NPC_ID,
+                    "x": x, "y": y, "actor": True} for i, (x, y) in enumerate(npc_cells)]
+
+    if chunked_world is not None:
+        # Off-screen entities live in their chunks until the window reaches them
+        for record in npc_records:
+            chunked_world.add_entity(record)
+        for x, y in item_cells:
+            chunked_world.add_entity({"object_data": BENCH_ITEM_ID, "x": x, "y": y})
+        world.load_window(*world.origin)
+        return
+
+    item_records = [{"object_data": BENCH_ITEM_ID, "x": x, "y": y} for x, y in item_cells]
+    world.add_records(npc_records + item_records)
+    world.apply_entity_layers()
+
+
+def add_recipes(recipe_manager: RecipeManager, count: int, seed: int):
+    """加载游戏配方，并生成count个随机配方"""
+    load_recipes(recipe_manager)
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        ingredients = [
+            Ingredient(item_id=f"material_{m}", quantity=int(rng.integers(1, 5)))
+            for m in rng.choice(50, size=int(rng.integers(1, 5)), replace=False)
+        ]
+        recipe_manager.add_recipe(CraftingRecipe(
+            id=f"recipe_{i}",
+            name=f"Recipe {i}",
+            description="Synthetic benchmark recipe.",
+            ingredients=ingredients,
+            result=Ingredient(item_id=f"product_{i}", quantity=1),
+            required_station=None if rng.random() < 0.5 else "workbench",
+            required_skill={"alchemy": int(rng.integers(0, 5))} if rng.random() < 0.3 else None,
+            category=f"Category {i % 8}",
+            tags=[f"tag_{i % 5}"],
+        ))
+
+
+def build_game(scenario: Scenario, chunk_store_dir: str) -> Game:
+    """Create a headless game in the playing state (rendering kept so it can be timed)
+
+    Chunked scenarios keep their chunks in chunk_store_dir; a new game
+    clears that directory, so it must not be the player's chunk store.
+    """
+    game = Game(headless=True, render=True)
+    game.chunk_store_dir = chunk_store_dir
+    game.map_data = generate_map(scenario)
+    game.initialize_game()
+    game.change_state(GameState.PLAYING)
+    populate(game, scenario)
+    assert game.recipe_manager is not None
+    add_recipes(game.recipe_manager, scenario.recipes, scenario.seed)
+    return game
@@ -0,0 +1,218 @@
+"""基准测试：计时各个热点操作，保存基线并与之比较"""
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from bench.scenarios import Scenario, build_game
+from game import Game
+
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.2  # 中位数变慢超过20%视为退化
+
+
+def measure(func: Callable[[], object], repeat: int,
+            setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Time func repeat times (setup runs before each call, untimed); results in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "max_ms": max(samples),
+        "repeat": repeat,
+    }
+
+
+def benchmark_operations(game: Game, scenario: Scenario,
+                         save_dir: str) -> Dict[str, Callable[[int], Dict[str, float]]]:
+    """场景中要计时的操作：名称 -> 以重复次数为参数的计时函数"""
+    world = game.world
+    player = game.player
+    assert world is not None and player is not None and game.save_system is not None
+
+    # Path targets are fixed up front so every run times the same searches
+    rng = np.random.default_rng(scenario.seed + 2)
+    floor = np.argwhere(~world.blocks_movement)
+    targets = [tuple(int(v) for v in floor[i]) for i in rng.choice(len(floor), size=8)]
+    target_index = [0]
+
+    def find_path():
+        tx, ty = targets[target_index[0] % len(targets)]
+        target_index[0] += 1
+        world.find_path(player.x, player.y, tx, ty)
+
+    def clear_fov_cache():
+        world._fov_cache.clear()
+        world._fov_key = None
+
+    def compute_fov():
+        world.compute_fov(player.x, player.y)
+
+    def render():
+        world.render(game.surfaces["game_container"], game.char_size, game.font)
+
+    # Saves go to a scratch directory so real save slots are left alone
+    save_system = game.save_system
+    save_system.save_dir = save_dir
+
+    def save_game():
+        # Include the background write, not just the snapshot
+        save_system.save_game(1)
+        save_system.wait()
+
+    def load_game():
+        if not save_system.load_game(1):
+            raise RuntimeError("load_game returned False")
+
+    recipe_manager = game.recipe_manager
+    assert recipe_manager is not None
+    inventory = {f"material_{m}": 3 for m in range(35)}
+
+    def get_available_recipes():
+        recipe_manager.get_available_recipes(
+            inventory, station="workbench", skills={"alchemy": 2})
+
+    return {
+        "find_path": lambda repeat: measure(find_path, repeat),
+        "compute_fov": lambda repeat: measure(compute_fov, repeat, setup=clear_fov_cache),
+        "render": lambda repeat: measure(render, repeat, setup=lambda: world.dirty.fill(True)),
+        "handle_world_turns": lambda repeat: measure(game.handle_world_turns, repeat),
+        "save_game": lambda repeat: measure(save_game, repeat),
+        "load_game": lambda repeat: measure(load_game, repeat, setup=save_game),
+        "get_available_recipes": lambda repeat: measure(get_available_recipes, repeat),
+    }
+
+
+def run_scenario(scenario: Scenario, repeat: int = DEFAULT_REPEAT,
+                 operations: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Run one scenario's operations
+
+    A failing operation is recorded as an error entry instead of aborting
+    the run; compare_results() counts it as a failure. Chunks and saves
+    go to a scratch directory that is removed afterwards, so the
+    player's saves and chunk store are left alone.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench_") as scratch:
+        start = time.perf_counter()
+        game = build_game(scenario, os.path.join(scratch, "chunks"))
+        results: Dict[str, dict] = {
+            "setup": {"median_ms": (time.perf_counter() - start) * 1000, "repeat": 1}}
+        operations_by_name = benchmark_operations(game, scenario, os.path.join(scratch, "saves"))
+        for name, timer in operations_by_name.items():
+            if operations and name not in operations:
+                continue
+            try:
+                results[name] = timer(repeat)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+        # Finish background writes before the scratch directory goes away
+        assert game.save_system is not None
+        game.save_system.shutdown()
+    return results
+
+
+def run_benchmarks(scenarios: List[Scenario], repeat: int = DEFAULT_REPEAT,
+                   operations: Optional[List[str]] = None) -> dict:
+    """运行多个场景，返回可直接写入JSON的结果"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "scenarios": {
+            scenario.name: {
+                "params": vars(scenario),
+                "results": run_scenario(scenario, repeat, operations),
+            }
+            for scenario in scenarios
+        },
+    }
+
+
+def save_results(results: dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline: dict, current: dict,
+                    threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """Compare the median of every timed operation present in both result sets
+
+    Each row has the scenario, operation, both medians and the relative
+    change; `regression` is set when the current median is slower than
+    the baseline by more than threshold (0.2 = 20%). An operation that
+    failed in the current run gives a row with `error` set, which counts
+    as a regression.
+    """
+    rows = []
+    for scenario, data in current["scenarios"].items():
+        base_data = baseline["scenarios"].get(scenario)
+        if base_data is None:
+            continue
+        for operation, result in data["results"].items():
+            if operation == "setup":
+                continue  # a single untimed-repeat sample; too noisy to gate on
+            if "error" in result:
+                rows.append({"scenario": scenario, "operation": operation,
+                             "error": result["error"], "regression": True})
+                continue
+            base = base_data["results"].get(operation)
+            if base is None or "median_ms" not in base:
+                continue
+            change = (result["median_ms"] - base["median_ms"]) / max(base["median_ms"], 1e-9)
+            rows.append({
+                "scenario": scenario,
+                "operation": operation,
+                "baseline_ms": base["median_ms"],
+                "current_ms": result["median_ms"],
+                "change": change,
+                "regression": change > threshold,
+            })
+    return rows
+
+
+def format_results(results: dict) -> str:
+    """结果表格（中位数/最小值，毫秒）"""
+    lines = [f"{'scenario':<10} {'operation':<22} {'median ms':>10} {'min ms':>10}"]
+    for scenario, data in results["scenarios"].items():
+        for operation, result in data["results"].items():
+            if "error" in result:
+                lines.append(f"{scenario:<10} {operation:<22} {'error':>10}  {result['error']}")
+                continue
+            lines.append(f"{scenario:<10} {operation:<22} "
+                         f"{result['median_ms']:>10.3f} {result.get('min_ms', result['median_ms']):>10.3f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict], threshold: float) -> str:
+    """比较表格，退化的行以 ! 标出"""
+    lines = [f"{'':2}{'scenario':<10} {'operation':<22} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for row in rows:
+        flag = "! " if row["regression"] else "  "
+        if "error" in row:
+            lines.append(f"{flag}{row['scenario']:<10} {row['operation']:<22} error: {row['error']}")
+            continue
+        lines.append(f"{flag}{row['scenario']:<10} {row['operation']:<22} "
+                     f"{row['baseline_ms']:>10.3f} {row['current_ms']:>10.3f} {row['change']:>+8.1%}")
+    regressions = sum(row["regression"] for row in rows)
+    lines.append(f"{regressions} regression(s) or failure(s) beyond {threshold:.0%}")
+    return "\n".join(lines)
@@ -0,0 +1,100 @@
+"""性能基准入口
+
+    python src/benchmark.py run [--scenarios tiny,medium] [--out bench_results.json]
+    python src/benchmark.py compare bench_baseline.json [bench_results.json] [--threshold 0.2]
+
+compare without a results file runs the benchmarks first. Both commands
+exit with status 1 when an operation failed; compare also does when any
+operation regressed beyond the threshold.
+"""
+import argparse
+import sys
+
+from bench import SCENARIOS, Scenario, run_benchmarks, compare_results, save_results, load_results
+from bench.suite import DEFAULT_REPEAT, DEFAULT_THRESHOLD, format_results, format_comparison
+from utils import setup_logging
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark game hot paths on synthetic maps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(command):
+        command.add_argument("--scenarios", default=",".join(SCENARIOS),
+                             help=f"comma-separated presets ({', '.join(SCENARIOS)}) or WxH sizes")
+        command.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+        command.add_argument("--operations", default="",
+                             help="comma-separated subset of operations to time")
+        command.add_argument("--wall-density", type=float, default=None)
+        command.add_argument("--npcs", type=int, default=None)
+        command.add_argument("--items", type=int, default=None)
+
+    run = commands.add_parser("run", help="run the benchmarks and write a JSON baseline")
+    add_run_options(run)
+    run.add_argument("--out", default="bench_baseline.json")
+
+    compare = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("results", nargs="?", help="results file; runs the benchmarks if omitted")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="allowed slowdown of the median (0.2 = 20%%)")
+    compare.add_argument("--out", default=None, help="also write the fresh results here")
+    add_run_options(compare)
+    return parser.parse_args(argv)
+
+
+def select_scenarios(args) -> list:
+    """解析场景列表，并应用命令行覆盖的参数"""
+    scenarios = []
+    for name in filter(None, args.scenarios.split(",")):
+        if name in SCENARIOS:
+            scenario = Scenario(**vars(SCENARIOS[name]))
+        elif "x" in name:
+            width, height = (int(v) for v in name.split("x"))
+            scenario = Scenario(name, width, height)
+        else:
+            raise SystemExit(f"Unknown scenario: {name}")
+        for option in ("wall_density", "npcs", "items"):
+            if getattr(args, option) is not None:
+                setattr(scenario, option, getattr(args, option))
+        scenarios.append(scenario)
+    return scenarios
+
+
+def run(args) -> dict:
+    operations = [name for name in args.operations.split(",") if name]
+    results = run_benchmarks(select_scenarios(args), args.repeat, operations)
+    print(format_results(results))
+    return results
+
+
+def has_errors(results: dict) -> bool:
+    """是否有操作执行失败"""
+    return any("error" in result for data in results["scenarios"].values()
+               for result in data["results"].values())
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Warnings only, and no ring buffer, so logging stays out of the timings
+    setup_logging(level="WARNING", ring_buffer_size=0)
+    if args.command == "run":
+        results = run(args)
+        save_results(results, args.out)
+        print(f"Results written to {args.out}")
+        return 1 if has_errors(results) else 0
+
+    baseline = load_results(args.baseline)
+    if args.results:
+        current = load_results(args.results)
+    else:
+        current = run(args)
+        if args.out:
+            save_results(current, args.out)
+    rows = compare_results(baseline, current, args.threshold)
+    print(format_comparison(rows, args.threshold))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 # 游戏设置
 GAME_TITLE = "Apprentice Log: Workshop Restoration"
 GAME_DESCRIPTION = "A cozy crafting game about restoring an alchemist's workshop."
-CURRENT_VERSION = "1.0"
+CURRENT_VERSION = "2.2"  # 存档格式改变时递增；版本不同的存档不会被加载
 
 # 屏幕和网格尺寸
 SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
@@ -18,9 +18,47 @@ MAP_WIDTH, MAP_HEIGHT = (
 )
 UI_HEIGHT = MAP_HEIGHT
 
+# 主循环设置
+FPS_CAP = 60  # 帧率上限（有动画时逐帧重绘）
+IDLE_WAIT_MS = 1000  # 空闲时等待事件的最长时间（毫秒）
+
 # 内边距和外边距
 INNER_PADDING = 6
 OUTER_PADDING = 6
 
+# 分块地图设置（地图大于屏幕时使用）
+CHUNK_SIZE = 32  # 区块边长（格）
+CHUNK_LOAD_RADIUS = 1  # 常驻区块半径（以玩家所在区块为中心）
+CHUNK_STORE_DIR = "saves/chunks"
+MAP_SCROLL_MARGIN = 4  # 玩家距窗口边缘小于该值时滚动窗口
+SPATIAL_HASH_CELL_SIZE = 8  # 实体空间哈希的网格边长（格）
+
+# 视野设置
+FOV_RADIUS = 3
+FOV_CACHE_SIZE = 64  # 缓存的视野结果数量
+
+# 存档设置
+AUTOSAVE_SLOT = 0  # 自动存档使用的存档槽
+AUTOSAVE_INTERVAL = 20  # 每隔多少回合自动存档（0为关闭）
+SAVE_CODEC = "fast"  # json / compact / orjson / fast（有orjson时用orjson，否则compact）
+SAVE_COMPRESSION = "zlib"  # none / zlib / lzma
+
+# 消息日志设置
+MESSAGE_HISTORY_PATH = "saves/message_history.log"  # 当前游戏的消息历史（新游戏和读档时清空）
+MESSAGE_HISTORY_MAX_LINES = 10000  # 历史文件达到此行数时丢弃较早的一半
+MESSAGE_HISTORY_PAGE = 64  # 向前翻页时一次从磁盘读取的行数
+
 # 字体设置
 FONT_SIZE = 30
+GLYPH_CACHE_SIZE = 4096  # 缓存的字形/单词渲染结果数量
+TEXT_LAYOUT_CACHE_SIZE = 1024  # 每个字体缓存的已排版文本行数量
+
+# 性能分析设置
+PROFILER_HISTORY = 300  # 环形缓冲区保留的帧数
+PROFILER_CSV_PATH = "profiles/frame_profile.csv"
+
+# 日志设置
+LOG_LEVEL = "WARNING"  # 控制台输出的最低级别
+LOG_RING_BUFFER_SIZE = 0  # 内存中保留的最近日志条数（0为关闭），崩溃时导出
+LOG_RING_BUFFER_LEVEL = "DEBUG"  # 环形缓冲区记录的最低级别
+LOG_CRASH_DUMP_PATH = "logs/crash.log"
@@ -0,0 +1,35 @@
+"""NumPy数组的紧凑JSON编码：类型化数组与位压缩布尔数组，数据以base64保存"""
+import base64
+from typing import Any, Dict
+import numpy as np
+
+
+def encode_array(array: np.ndarray) -> Dict[str, Any]:
+    """Encode an array as {"dtype", "shape", "data"} with the raw bytes in base64"""
+    array = np.ascontiguousarray(array)
+    return {
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def decode_array(data: Dict[str, Any]) -> np.ndarray:
+    """encode_array 的逆操作"""
+    raw = base64.b64decode(data["data"])
+    return np.frombuffer(raw, dtype=np.dtype(data["dtype"])).reshape(data["shape"]).copy()
+
+
+def encode_bits(array: np.ndarray) -> Dict[str, Any]:
+    """Encode a boolean array packed eight cells to a byte"""
+    return {
+        "shape": list(array.shape),
+        "bits": base64.b64encode(np.packbits(array, axis=None).tobytes()).decode("ascii"),
+    }
+
+
+def decode_bits(data: Dict[str, Any]) -> np.ndarray:
+    """encode_bits 的逆操作"""
+    shape = data["shape"]
+    packed = np.frombuffer(base64.b64decode(data["bits"]), dtype=np.uint8)
+    return np.unpackbits(packed, count=int(np.prod(shape))).astype(bool).reshape(shape)
@@ -0,0 +1,86 @@
+"""存档编码：JSON后端（标准/紧凑/快速）与压缩方式的组合
+
+The codec used for a slot is recorded in its header line, so any
+combination written by one build can be read back by another (a save
+written with orjson only needs orjson to be read fast, not to be read).
+"""
+import json
+import lzma
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_CODECS = ("json", "compact", "orjson")
+COMPRESSIONS = ("none", "zlib", "lzma")
+
+_COMPRESSORS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (lambda data: data, lambda data: data),
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def fast_json_available() -> bool:
+    return orjson is not None
+
+
+class SaveCodec:
+    """Encodes one JSON value to bytes and back
+
+    name is "json" (indented), "compact", "orjson", or "fast" for orjson
+    when it is installed and compact JSON otherwise.
+    """
+
+    def __init__(self, name: str = "compact", compression: str = "none"):
+        if name == "fast":
+            name = "orjson" if fast_json_available() else "compact"
+        if name not in JSON_CODECS:
+            raise ValueError(f"Unknown save codec: {name}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown save compression: {compression}")
+        if name == "orjson" and not fast_json_available():
+            raise ValueError("Save codec 'orjson' requires the orjson package")
+        self.name = name
+        self.compression = compression
+        self._compress, self._decompress = _COMPRESSORS[compression]
+
+    def dumps(self, value: Any) -> bytes:
+        if self.name == "orjson":
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        if self.name == "json":
+            return json.dumps(value, indent=2).encode("utf-8")
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def encode(self, value: Any) -> bytes:
+        return self._compress(self.dumps(value))
+
+    def decode(self, data: bytes) -> Any:
+        """Raises ValueError for damaged data, whichever stage it fails in"""
+        try:
+            data = self._decompress(data)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Corrupt {self.compression} data: {e}") from e
+        # Every backend writes plain JSON, so orjson is only a faster reader
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def describe(self) -> Dict[str, str]:
+        """写入存档头部的编码信息"""
+        return {"codec": self.name, "compression": self.compression}
+
+    @classmethod
+    def from_header(cls, header: dict) -> 'SaveCodec':
+        """按头部记录选择编码；旧存档没有记录，视为未压缩JSON"""
+        name = header.get("codec", "json")
+        if name == "orjson" and not fast_json_available():
+            name = "compact"  # orjson output is plain JSON
+        return cls(name, header.get("compression", "none"))
+
+    def __repr__(self) -> str:
+        return f"SaveCodec({self.name!r}, {self.compression!r})"
+
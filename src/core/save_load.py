@@ -1,13 +1,28 @@
 """保存和加载游戏状态的功能模块"""
+import hashlib
 import json
+import logging
 import os
-from typing import TYPE_CHECKING
+import queue
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from datetime import datetime
+import pygame
 from config import CURRENT_VERSION
+from config.settings import AUTOSAVE_SLOT, SAVE_CODEC, SAVE_COMPRESSION
+from core.save_codec import SaveCodec
+from core.save_slot import SlotFile, encode_slot
+
+# Posted to the pygame event queue when a background save finishes, to wake the main loop
+SAVE_COMPLETE_EVENT = pygame.USEREVENT + 1
 
 if TYPE_CHECKING:
     from game import Game
 
+logger = logging.getLogger(__name__)
+
 
 class SaveLoadSystem:
     """保存和加载游戏状态的系统"""
@@ -18,113 +33,321 @@ class SaveLoadSystem:
         self.save_slots = 3  # 默认保存槽数量
         self.current_slot = 1  # 当前使用的保存槽
         self.save_file = "save_slot_1.json"  # 默认保存文件名
-        print("SaveLoadSystem initialized.")
+        # Loading picks the codec from each slot's header, so this only affects writing
+        self.codec = SaveCodec(SAVE_CODEC, SAVE_COMPRESSION)
+
+        # Saves are encoded and written on a worker thread; results come back
+        # through a queue and are reported on the main thread by poll()
+        self._jobs: 'queue.Queue[Optional[Tuple[int, dict, str]]]' = queue.Queue()
+        self._results: 'queue.Queue[Tuple[int, bool, str]]' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        # metadata.json is updated by the worker and by the slot browser
+        self._metadata_lock = threading.Lock()
+        logger.debug("SaveLoadSystem initialized.")
+
+    def is_valid_slot(self, slot: int) -> bool:
+        return slot == AUTOSAVE_SLOT or 1 <= slot <= self.save_slots
+
+    def slot_path(self, slot: int) -> str:
+        return os.path.join(self.save_dir, f"save_slot_{slot}.json")
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.save_dir, "metadata.json")
 
-    def save_game(self, slot: int) -> bool:
-        """将游戏状态保存到slot指定的文件中"""
+    def save_game(self, slot: int, message: Optional[str] = None) -> bool:
+        """Snapshot the game state and save it to slot in the background
+
+        Only the snapshot is taken on the calling thread; the map delta,
+        encoding and writing happen on the worker, and the result is reported to the
+        message log by poll(). Returns False if the save was not queued.
+        """
         if slot is None:
             slot = self.current_slot
 
-        if slot < 1 or slot > self.save_slots:
-            print(f"Invalid save slot: {slot}")
+        if not self.is_valid_slot(slot):
+            logger.warning("Invalid save slot: %s", slot)
             return False
 
-        if not os.path.exists(self.save_dir):
-            os.makedirs(self.save_dir, exist_ok=True)
-
         try:
-            # Prepare data to save
             save_data = self.prepare_save_data()
+        except (OSError, TypeError, ValueError) as e:
+            logger.error("Error saving game: %s", e)
+            self.game.message_log.add_message("Error saving game.")
+            return False
 
-            # Write to file
-            filename = f"save_slot_{slot}.json"
-            filepath = os.path.join(self.save_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2)  # Plain JSON for readability
+        self.start_worker()
+        self._jobs.put((slot, save_data, message or f"Game saved to slot {slot}."))
+        return True
 
-            # Update save metadata
-            self.update_save_metadata(slot, save_data)
+    def autosave(self) -> bool:
+        """保存到自动存档槽"""
+        return self.save_game(AUTOSAVE_SLOT, message="Autosaved.")
 
-            self.game.message_log.add_message(f"Game saved to slot {slot}.")
-            print(f"Game saved to {filepath}")
-            return True
+    def start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self.run_worker, name="save-worker", daemon=True)
+            self._worker.start()
 
-        except (OSError, IOError, TypeError, ValueError, json.JSONDecodeError) as e:
-            print(f"Error saving game: {e}")
-            self.game.message_log.add_message("Error saving game.")
-            return False
+    def run_worker(self):
+        """后台线程：依次编码并写入存档"""
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                slot, save_data, message = job
+                self._results.put(self.write_save(slot, save_data, message))
+                # Only the windowed event loop consumes the event; headless
+                # games report results from step() through poll()
+                if not self.game.headless:
+                    pygame.event.post(pygame.event.Event(SAVE_COMPLETE_EVENT))
+            finally:
+                self._jobs.task_done()
+
+    def write_save(self, slot: int, save_data: dict, message: str) -> Tuple[int, bool, str]:
+        """写入存档文件与元数据（在后台线程中运行）"""
+        try:
+            filepath = self.slot_path(slot)
+            save_data = self.finish_save_data(save_data)
+            data = encode_slot(save_data, self.codec)
+            # The file and its index entry change together, so the browser
+            # never sees a new file with the old entry (and marks it corrupt)
+            with self._metadata_lock:
+                self.atomic_write(filepath, data)
+                self.update_save_metadata(slot, save_data, len(data), hashlib.sha256(data).hexdigest())
+            logger.info("Game saved to %s", filepath)
+            return slot, True, message
+        except (OSError, IOError, TypeError, ValueError) as e:
+            logger.error("Error saving game: %s", e)
+            return slot, False, "Error saving game."
+
+    def atomic_write(self, filepath: str, data: bytes):
+        """Write to a temp file in the same directory, then rename over the target
+
+        A crash mid-write leaves the previous file intact instead of a
+        truncated one.
+        """
+        directory = os.path.dirname(filepath) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, filepath)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def poll(self) -> int:
+        """把已完成的后台存档结果写入消息日志（主线程调用），返回处理数量"""
+        count = 0
+        while True:
+            try:
+                _, _, message = self._results.get_nowait()
+            except queue.Empty:
+                return count
+            self.game.message_log.add_message(message)
+            count += 1
+
+    def wait(self):
+        """等待所有排队的存档写完，并报告结果"""
+        self._jobs.join()
+        self.poll()
 
-    def update_save_metadata(self, slot: int, save_data: dict):
-        """"更新保存文件的元数据"""
+    def shutdown(self):
+        """写完剩余存档后停止后台线程"""
+        if self._worker is not None and self._worker.is_alive():
+            self._jobs.put(None)
+            self._worker.join()
+        self.poll()
+
+    def update_save_metadata(self, slot: int, save_data: dict, size: int, checksum: str):
+        """"更新保存文件的元数据（调用方持有索引锁）"""
         try:
-            # Load existing metadata
-            metadata_file = os.path.join(self.save_dir, "metadata.json")
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-            else:
-                metadata = {}
-
-            # Update metadata for the specific slot
-            if "saves" not in metadata:
-                metadata["saves"] = {}
-
-            metadata["saves"][str(slot)] = {
-                "day": save_data.get("world_state", {}).get("day", 1),
-                "progress": save_data.get("world_state", {}).get("progress", 0),
-                "skills": save_data.get("mobile_player", {}).get("skills", {}),
+            game_data = save_data.get("game", {})
+            entry = {
+                "version": save_data.get("version"),
+                "day": (game_data.get("world_state") or {}).get("day", 1),
+                "progress": (game_data.get("world_state") or {}).get("progress", 0),
+                "skills": (game_data.get("mobile_player") or {}).get("skills", {}),
                 "timestamp": save_data.get("timestamp", datetime.now().isoformat()),
+                "size": size,
+                "checksum": checksum,
             }
-
-            # Save updated metadata back to file
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2)
+            metadata = self.read_metadata()
+            metadata["saves"][str(slot)] = entry
+            self.write_metadata(metadata)
         except (OSError, IOError, TypeError, ValueError, json.JSONDecodeError) as e:
-            print(f"Error updating save metadata: {e}")
+            logger.error("Error updating save metadata: %s", e)
+
+    def read_metadata(self) -> dict:
+        """读取存档索引（不存在或损坏时为空索引）"""
+        try:
+            with open(self.metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+        metadata.setdefault("saves", {})
+        return metadata
+
+    def write_metadata(self, metadata: dict):
+        self.atomic_write(self.metadata_path, json.dumps(metadata, indent=2).encode("utf-8"))
+
+    def list_slots(self) -> List[dict]:
+        """Slot summaries for the save browser, read from the metadata index only
+
+        Slot files are only opened when their index entry is missing (or
+        predates the size and version fields); then the header is read
+        and the entry rebuilt. A file whose size no longer matches its entry was
+        changed outside the game, so it is marked corrupt rather than
+        re-indexed from the damaged bytes. Saves from another version are
+        flagged incompatible, since load_game() refuses them.
+        """
+        with self._metadata_lock:
+            metadata = self.read_metadata()
+            slots = []
+            changed = False
+            for slot in [AUTOSAVE_SLOT, *range(1, self.save_slots + 1)]:
+                path = self.slot_path(slot)
+                entry = metadata["saves"].get(str(slot))
+                size = os.path.getsize(path) if os.path.exists(path) else None
+                if size is None:
+                    slots.append({"slot": slot, "empty": True})
+                    continue
+                if entry is None or "size" not in entry or "version" not in entry:
+                    entry = self.metadata_from_header(path, size)
+                    metadata["saves"][str(slot)] = entry
+                    changed = True
+                elif entry["size"] != size and not entry.get("corrupt"):
+                    entry["corrupt"] = True
+                    changed = True
+                slots.append({"slot": slot, "empty": False, **entry,
+                              "incompatible": entry.get("version") != CURRENT_VERSION})
+            if changed:
+                try:
+                    self.write_metadata(metadata)
+                except OSError as e:
+                    logger.error("Error updating save metadata: %s", e)
+            return slots
+
+    def metadata_from_header(self, path: str, size: int) -> dict:
+        """从存档头部重建索引条目（无法读取时标记为损坏）"""
+        try:
+            header = SlotFile(path).header
+            with open(path, 'rb') as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+        except (OSError, ValueError) as e:
+            logger.error("Unreadable save file %s: %s", path, e)
+            return {"version": None, "size": size, "corrupt": True}
+        world_state = header.get("world_state") or {}
+        return {
+            "version": header.get("version"),
+            "day": world_state.get("day", 1),
+            "progress": world_state.get("progress", 0),
+            "skills": header.get("skills", {}),
+            "timestamp": header.get("timestamp"),
+            "size": size,
+            "checksum": checksum,
+        }
+
+    def verify_slot(self, slot: int) -> bool:
+        """Check a slot file against the checksum in its index entry
+
+        A mismatch marks the entry as corrupt so the browser can show it;
+        the next save to the slot replaces the entry. Entries already
+        marked corrupt fail; slots without a recorded checksum pass.
+        """
+        with self._metadata_lock:
+            metadata = self.read_metadata()
+            entry = metadata["saves"].get(str(slot))
+            if entry is not None and entry.get("corrupt"):
+                return False
+            if entry is None or "checksum" not in entry:
+                return True
+            with open(self.slot_path(slot), 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() == entry["checksum"]:
+                    return True
+            entry["corrupt"] = True
+            try:
+                self.write_metadata(metadata)
+            except OSError as e:
+                logger.error("Error updating save metadata: %s", e)
+            return False
+
+    def delete_slot(self, slot: int) -> bool:
+        """删除存档及其索引条目"""
+        self.wait()
+        path = self.slot_path(slot)
+        if not os.path.exists(path):
+            return False
+        with self._metadata_lock:
+            os.remove(path)
+            metadata = self.read_metadata()
+            metadata["saves"].pop(str(slot), None)
+            self.write_metadata(metadata)
+        return True
 
     def load_game(self, slot: int) -> bool:
         """从slot指定的文件中加载游戏状态"""
-        if slot < 1 or slot > self.save_slots:
-            print(f"Invalid save slot: {slot}")
+        # A save to this slot may still be in flight
+        self.wait()
+        if not self.is_valid_slot(slot):
+            logger.warning("Invalid save slot: %s", slot)
             return False
         try:
-            filename = f"save_slot_{slot}.json"
-            filepath = os.path.join(self.save_dir, filename)
+            filepath = self.slot_path(slot)
 
             # Check if file exists
             if not os.path.exists(filepath):
-                print(f"No save file found at {filepath}")
+                logger.warning("No save file found at %s", filepath)
                 return False
 
-            with open(filepath, 'r', encoding='utf-8') as f:
-                save_data = json.load(f)
+            if not self.verify_slot(slot):
+                logger.error("Save file %s failed verification", filepath)
+                self.game.message_log.add_message(f"Save slot {slot} is corrupted.")
+                return False
+
+            # Only the header is read here; sections are read as they are applied
+            slot_file = SlotFile(filepath)
+
+            # Older layouts are not migrated, so refuse them before touching the game
+            version = slot_file.header.get("version")
+            if version != CURRENT_VERSION:
+                logger.error("Unsupported save file version in %s: %s != %s",
+                             filepath, version, CURRENT_VERSION)
+                self.game.message_log.add_message(
+                    f"Save slot {slot} is from an incompatible version ({version}).")
+                return False
 
             # Apply loaded data to game state
-            self.apply_save_data(save_data)
+            self.apply_save_data(slot_file.header, slot_file.game_data())
 
-            print(f"Game loaded from {filepath}")
+            logger.info("Game loaded from %s", filepath)
+            self.game.message_log.add_message(f"Game loaded from slot {slot}.")
             return True
-        except (OSError, IOError, TypeError, ValueError, json.JSONDecodeError) as e:
-            print(f"Error loading game: {e}")
+        except (OSError, IOError, IndexError, KeyError, TypeError, ValueError, json.JSONDecodeError) as e:
+            logger.error("Error loading game: %s", e)
             self.game.message_log.add_message("Error loading game.")
             return False
 
     def prepare_save_data(self) -> dict:
-        """准备要保存的数据字典"""
+        """准备要保存的数据字典（主线程，只做快照）"""
         save_data = {
             "version": CURRENT_VERSION,
             "timestamp": datetime.now().isoformat(),
-            "game": self.game.to_dict(),
+            "game": self.game.snapshot(),
         }
         return save_data
 
-    def apply_save_data(self, save_data: dict):
-        """将加载的数据应用到游戏状态"""
-        # Check version compatibility
-        if save_data.get("version") != CURRENT_VERSION:
-            print(
-                f"Incompatible save file version: {save_data.get('version')} != {CURRENT_VERSION}")
-            self.game.message_log.add_message(
-                "Warning: Save file version may be incompatible.")
+    def finish_save_data(self, save_data: dict) -> dict:
+        """Replace the map snapshot with its delta (worker thread)"""
+        game_data = save_data["game"]
+        world = game_data["world"]
+        return {**save_data, "game": {**game_data, "world": world.to_delta() if world is not None else None}}
 
-        self.game.from_dict(save_data.get("game", {}))
+    def apply_save_data(self, header: dict, game_data: Mapping):
+        """将加载的数据应用到游戏状态（调用前已检查版本）"""
+        self.game.from_dict(game_data)
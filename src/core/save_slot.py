@@ -0,0 +1,117 @@
+"""分段存档文件：一行JSON头部，后接可单独读取的各个分段
+
+Layout of a slot file:
+
+    {"format": "sections", "version": ..., "codec": ..., "compression": ...,
+     "world_state": ..., "skills": ..., "sections": {"world": [offset, length], ...}}\\n
+    <world><player><log>
+
+The header is always plain JSON; each section is encoded with the codec
+it names. Section offsets are relative to the first byte after the header
+line, so reading the header is a single readline and each section a
+seek + read + decode.
+"""
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+from core.save_codec import SaveCodec
+
+SLOT_FORMAT = "sections"
+
+# Game.snapshot() key -> section name; world_state is small and lives in the header
+SECTION_KEYS = {
+    "world": "world",
+    "mobile_player": "player",
+    "message_log": "log",
+}
+
+
+def encode_slot(save_data: dict, codec: SaveCodec) -> bytes:
+    """把 finish_save_data() 的结果编码为分段存档"""
+    game_data = save_data.get("game", {})
+    bodies = []
+    sections = {}
+    offset = 0
+    for key, section in SECTION_KEYS.items():
+        body = codec.encode(game_data.get(key))
+        sections[section] = [offset, len(body)]
+        bodies.append(body)
+        offset += len(body)
+    header = {
+        "format": SLOT_FORMAT,
+        "version": save_data.get("version"),
+        "timestamp": save_data.get("timestamp"),
+        **codec.describe(),
+        "world_state": game_data.get("world_state"),
+        "skills": (game_data.get("mobile_player") or {}).get("skills", {}),
+        "sections": sections,
+    }
+    return json.dumps(header).encode("utf-8") + b"\n" + b"".join(bodies)
+
+
+class SlotFile:
+    """Reads a slot file's header eagerly and its sections on demand
+
+    Whole-file JSON saves from before the sectioned layout cannot be
+    loaded any more; only their header fields are read, so the save
+    browser can show their version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sections: Dict[str, Any] = {}
+        self.legacy = False
+        with open(path, "rb") as f:
+            first_line = f.readline()
+            self.body_start = f.tell()
+            try:
+                header = json.loads(first_line)
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or header.get("format") != SLOT_FORMAT:
+                f.seek(0)
+                saved = json.loads(f.read())
+                if not isinstance(saved, dict):
+                    raise ValueError(f"Not a save file: {path}")
+                header = {key: value for key, value in saved.items() if key != "game"}
+                header["world_state"] = (saved.get("game") or {}).get("world_state")
+                self.legacy = True
+        self.header: dict = header
+        self.codec = SaveCodec.from_header(header)
+
+    def section(self, name: str) -> Any:
+        """读取一个分段（结果会被缓存）"""
+        if self.legacy:
+            raise ValueError(f"{self.path} predates sectioned saves")
+        if name in self._sections:
+            return self._sections[name]
+        offset, length = self.header["sections"][name]
+        with open(self.path, "rb") as f:
+            f.seek(self.body_start + offset)
+            value = self.codec.decode(f.read(length))
+        self._sections[name] = value
+        return value
+
+    def game_data(self) -> 'LazyGameData':
+        return LazyGameData(self)
+
+
+class LazyGameData(Mapping):
+    """The saved game data of a slot as a mapping; each section is read when first accessed"""
+
+    def __init__(self, slot_file: SlotFile):
+        self.slot_file = slot_file
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "world_state":
+            return self.slot_file.header.get("world_state")
+        if key not in SECTION_KEYS:
+            raise KeyError(key)
+        return self.slot_file.section(SECTION_KEYS[key])
+
+    def __iter__(self) -> Iterator[str]:
+        yield "world_state"
+        yield from SECTION_KEYS
+
+    def __len__(self) -> int:
+        return len(SECTION_KEYS) + 1
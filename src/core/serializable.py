@@ -1,39 +1,121 @@
 """A mixin class for serializable objects."""
-from typing import Any, Dict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+
+class FieldKind:
+    """How one declared field is converted to and from its saved form
+
+    None values are saved as None and never passed to a converter.
+    """
+
+    def encode(self, value: Any) -> Any:
+        return value
+
+    def decode(self, instance: Any, name: str, value: Any,
+               resolve: Optional[Callable[[str], Any]]) -> None:
+        setattr(instance, name, value)
+
+
+class TupleField(FieldKind):
+    """Tuples are saved as JSON lists and restored as tuples"""
+
+    def decode(self, instance, name, value, resolve):
+        setattr(instance, name, tuple(value))
+
+
+class EnumField(FieldKind):
+    """Enum members are saved by name"""
+
+    def __init__(self, enum_type: Type[Enum]):
+        self.enum_type = enum_type
+
+    def encode(self, value: Enum) -> str:
+        return value.name
+
+    def decode(self, instance, name, value, resolve):
+        setattr(instance, name, self.enum_type[value])
+
+
+class RefField(FieldKind):
+    """Another object saved by id, to avoid recursion
+
+    On load the id is passed to resolve(); without a resolver the current
+    attribute is kept (the owner relinks it).
+    """
+
+    def encode(self, value: Any) -> str:
+        return value.id
+
+    def decode(self, instance, name, value, resolve):
+        if resolve is not None:
+            setattr(instance, name, resolve(value))
+
+
+class NestedField(FieldKind):
+    """A Serializable attribute saved as its own to_dict(); loaded into the existing object"""
+
+    def encode(self, value: 'Serializable') -> Dict[str, Any]:
+        return value.to_dict()
+
+    def decode(self, instance, name, value, resolve):
+        current = getattr(instance, name, None)
+        if current is not None:
+            current.from_dict(value, resolve)
+
+
+VALUE = FieldKind()
+TUPLE = TupleField()
+REF = RefField()
+NESTED = NestedField()
+
+FieldPlan = List[Tuple[str, FieldKind]]
+
+_plans: Dict[type, FieldPlan] = {}
+
+
+def serialization_plan(cls: type) -> FieldPlan:
+    """The cached field list of a class: its own serializable_fields after its bases'"""
+    plan = _plans.get(cls)
+    if plan is None:
+        fields: Dict[str, FieldKind] = {}
+        for klass in reversed(cls.__mro__):
+            fields.update(klass.__dict__.get("serializable_fields", {}))
+        plan = _plans[cls] = list(fields.items())
+    return plan
 
 
 class Serializable:
-    """A mixin class for serializable objects."""
+    """A mixin class for serializable objects.
+
+    Subclasses declare the fields they add in serializable_fields
+    (name -> FieldKind); inherited declarations are included.
+    """
 
-    def __init__(self):
-        self._serializable_exclude = set()  # Attributes to exclude from serialization
+    serializable_fields: Dict[str, FieldKind] = {}
 
     def to_dict(self) -> Dict[str, Any]:
         """Returns a dictionary of the object's state that should be saved."""
-        # Default implementation: save all instance variables that are not callable and do not start with '_'
-        print(
-            f"serializable: Serializing object: {self.__class__.__name__} with id: {getattr(self, 'id', 'N/A')}")
         data = {}
-        for key, value in self.__dict__.items():
-            if key not in self._serializable_exclude:
-                if not callable(value) and not key.startswith('_'):
-                    if hasattr(value, 'to_dict'):
-                        # 如果属性本身是可序列化的对象，递归调用to_dict
-                        data[key] = value.to_dict()
-                    else:
-                        data[key] = value
+        for name, kind in serialization_plan(type(self)):
+            value = getattr(self, name)
+            if kind is VALUE or value is None:
+                data[name] = value
+            else:
+                data[name] = kind.encode(value)
         return data
 
-    def from_dict(self, data: Dict[str, Any]) -> None:
+    def from_dict(self, data: Dict[str, Any],
+                  resolve: Optional[Callable[[str], Any]] = None) -> None:
         """
-        Takes a dictionary of saved state and returns an instance of the class.
-        Override this in subclasses for more complex deserialization logic.
+        Restores the declared fields present in data.
+        resolve(id) looks up the objects of REF fields.
         """
-        for key, value in data.items():
-            if hasattr(self, key):
-                current_attr = getattr(self, key)
-                # If the current attribute is serializable, we might want to call its from_dict method
-                if hasattr(current_attr, 'from_dict') and isinstance(value, dict):
-                    current_attr.from_dict(value)
-                else:
-                    setattr(self, key, value)
+        for name, kind in serialization_plan(type(self)):
+            if name not in data:
+                continue
+            value = data[name]
+            if value is None:
+                setattr(self, name, None)
+            else:
+                kind.decode(self, name, value, resolve)
@@ -1,5 +1,6 @@
 from data.recipes import load_recipes
 from data.object_manager import ObjectManager
 from data.activators import create_activators
+from data.statics import create_statics
 
-__all__ = ["load_recipes", "ObjectManager", "create_activators"]
+__all__ = ["load_recipes", "ObjectManager", "create_activators", "create_statics"]
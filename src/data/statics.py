@@ -0,0 +1,7 @@
+from config import COLOR, WALL, FLOOR
+from entities.static import Static
+
+
+def create_statics(object_manager):
+    object_manager.add_object(Static("floor", FLOOR, COLOR.LIGHT_TAUPE, blocks=False))
+    object_manager.add_object(Static("wall", WALL, COLOR.INK, blocks=True))
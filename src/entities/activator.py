@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from typing import Callable, Dict, Optional
 
+from core.serializable import TUPLE, VALUE
 from entities.game_object import ObjectType
 from entities.physical_object import PhysicalObject
 
@@ -9,6 +10,9 @@ from entities.physical_object import PhysicalObject
 class Activator(PhysicalObject):
     """可交互对象，存储交互逻辑"""
 
+    # actions are callables registered with the object and are not saved
+    serializable_fields = {"name": VALUE, "char": VALUE, "color": TUPLE}
+
     def __init__(self, activator_id: str, name: str, char: str, color: tuple, actions: Optional[Dict[str, Callable]] = None):
         super().__init__(activator_id, object_type=ObjectType.ACTIVATOR,
                          blocks=True, interactable=True)
@@ -1,9 +1,13 @@
 from config import COLOR
+from core.serializable import TUPLE, VALUE
 from entities.game_object import ObjectType
 from entities.physical_object import PhysicalObject
 
 
 class Door(PhysicalObject):
+    serializable_fields = {"name": VALUE, "color": TUPLE, "char": VALUE,
+                           "close_char": VALUE, "open_char": VALUE}
+
     def __init__(self, door_id, name, char="+", color=COLOR.SADDLE_BROWN):
         super().__init__(door_id, object_type=ObjectType.DOOR, blocks=True, interactable=True)
         self.name = name
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum, auto
-from core import Serializable
+from core.serializable import Serializable, EnumField, VALUE
 
 
 class ObjectType(Enum):
@@ -20,6 +20,8 @@ class ObjectType(Enum):
 class GameObject(Serializable):
     """所有游戏对象的基类"""
 
+    serializable_fields = {"id": VALUE, "object_type": EnumField(ObjectType)}
+
     def __init__(self, obj_id: str, object_type: ObjectType):
         super().__init__()
         self.id = obj_id
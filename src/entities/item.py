@@ -1,9 +1,12 @@
+from core.serializable import TUPLE, VALUE
 from entities.physical_object import PhysicalObject, ObjectType
 
 
 class Item(PhysicalObject):
     """物品类，可被拾取和存储在库存中"""
 
+    serializable_fields = {"name": VALUE, "char": VALUE, "color": TUPLE}
+
     def __init__(self, item_id: str, name: str, char: str, color: tuple):
         super().__init__(item_id, object_type=ObjectType.ITEM, blocks=False, interactable=True)
         # 物品不存储位置信息，当它们在地图上时，会有一个对应的Reference对象
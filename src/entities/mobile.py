@@ -1,5 +1,6 @@
+import logging
 from typing import TYPE_CHECKING
-from core import Serializable
+from core.serializable import Serializable, REF, VALUE
 
 
 if TYPE_CHECKING:
@@ -8,10 +9,15 @@ if TYPE_CHECKING:
     from entities.reference import Reference
     from game import Game
 
+logger = logging.getLogger(__name__)
+
 
 class Mobile(Serializable):
     """可移动的实体，有位置信息且可以移动"""
 
+    # reference is saved by id to avoid recursion
+    serializable_fields = {"x": VALUE, "y": VALUE, "hp": VALUE, "reference": REF}
+
     def __init__(self, x: int, y: int, reference: 'Reference[NPC|Player]'):
         super().__init__()
         self.x = x
@@ -20,29 +26,24 @@ class Mobile(Serializable):
 
         self.hp = self.reference.object_data.max_hp or 10
 
-        self._serializable_exclude.add('reference')  # 避免递归序列化
+        # Keep the reference's mobile link
+        self.reference.mobile = self
 
     def move(self, dx: int, dy: int, game: 'Game'):
         """移动实体"""
         if game.world is None:
-            print("没有游戏世界，无法移动")
+            logger.warning("没有游戏世界，无法移动")
             return
         new_x = self.x + dx
         new_y = self.y + dy
 
         if game.world.is_within_bounds(new_x, new_y):
-            # Move player and sync reference position
-            self.x, self.y = new_x, new_y
-            self.reference.x, self.reference.y = new_x, new_y
+            # Move via the map so the reference, this mobile and the
+            # map's render state stay in sync
+            game.world.move_reference(self.reference, new_x, new_y)
         else:
-            print("移动超出边界")
+            logger.debug("移动超出边界: (%d, %d)", new_x, new_y)
 
     def greet(self, target: 'Reference') -> str | None:
         """Greet another actor and return result message"""
         return f"{self.reference.object_data.name} greets {target.object_data.name}!"
-
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        # Avoid deep recursion by only storing reference ID
-        data['reference'] = self.reference.id
-        return data
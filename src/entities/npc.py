@@ -1,3 +1,4 @@
+from core.serializable import NESTED, TUPLE, VALUE
 from entities.game_object import ObjectType
 from entities.inventory import Inventory
 from entities.physical_object import PhysicalObject
@@ -6,6 +7,9 @@ from entities.physical_object import PhysicalObject
 class NPC(PhysicalObject):
     """行动者类，可以执行动作并有库存"""
 
+    serializable_fields = {"name": VALUE, "char": VALUE, "color": TUPLE,
+                           "inventory": NESTED, "max_hp": VALUE}
+
     def __init__(self, actor_id: str, name: str, char: str, color: tuple):
         super().__init__(actor_id, object_type=ObjectType.NPC, blocks=True, interactable=True)
         self.name = name
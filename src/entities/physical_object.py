@@ -1,9 +1,12 @@
+from core.serializable import VALUE
 from entities.game_object import GameObject, ObjectType
 
 
 class PhysicalObject(GameObject):
     """A physical object in the game world."""
 
+    serializable_fields = {"blocks": VALUE, "interactable": VALUE}
+
     def __init__(
         self,
         obj_id: str,
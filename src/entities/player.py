@@ -1,6 +1,8 @@
-from typing import List, TYPE_CHECKING, cast
+import logging
+from typing import TYPE_CHECKING, cast
 import config.colors as COLOR
 from config.symbols import PLAYER, PLAYER_NAME
+from core.serializable import NESTED, VALUE
 from entities.game_object import ObjectType
 from entities.mobile import Mobile
 from entities.npc import NPC
@@ -9,6 +11,9 @@ from entities.reference import Reference
 
 if TYPE_CHECKING:
     from game import Game
+    from world import GameMap
+
+logger = logging.getLogger(__name__)
 
 
 class Player(NPC):
@@ -22,6 +27,9 @@ class Player(NPC):
 class MobilePlayer(Mobile):
     """玩家类，继承自 Mobile"""
 
+    serializable_fields = {"object_data": NESTED, "skills": VALUE,
+                           "equipped_tool": VALUE, "location": VALUE}
+
     def __init__(self, x: int, y: int, reference: 'Reference[Player]'):
         super().__init__(x, y, reference)
         self.object_data: Player = reference.object_data  # 关联的实体对象，如Player
@@ -37,29 +45,26 @@ class MobilePlayer(Mobile):
         new_x, new_y = self.x + dx, self.y + dy
 
         if game.world is None:
-            print("Game world is not initialized.")
-            return {"moved": False}
-
-        # Check for wall collision
-        if game.world.is_blocked(new_x, new_y):
-            print(f"Movement blocked at ({new_x}, {new_y})")
+            logger.warning("Game world is not initialized.")
             return {"moved": False}
 
         # Check for entity interaction at new position
-        target = None
-        for ref in game.world.references:
-            if ref.x == new_x and ref.y == new_y:
-                # Ignore floor and wall references
-                if ref.object_data.interactable:
-                    target = ref
-                    break
+        target = game.world.get_interactable_at(new_x, new_y)
+
+        # Check for wall collision. Closed doors are in the blocking layer
+        # like walls, so the door is looked up first: walking into a
+        # closed door opens it
+        if game.world.is_blocked(new_x, new_y) and not (
+                target and target.object_data.object_type == ObjectType.DOOR):
+            logger.debug("Movement blocked at (%d, %d)", new_x, new_y)
+            return {"moved": False}
 
         if target:
-            print(f"Interacting with entity {target.id} at ({new_x}, {new_y})")
-            if target.object_data.blocks:
-                print(f"Entity {target.id} blocks movement.")
+            logger.debug("Interacting with entity %s at (%d, %d)", target.id, new_x, new_y)
+            if target.blocks:
+                logger.debug("Entity %s blocks movement.", target.id)
                 if target.object_data.object_type == ObjectType.DOOR:
-                    print("Door interaction")
+                    logger.debug("Door interaction")
                     # Handle door interaction
                     message = target.activate(game)
                     super().move(dx, dy, game)
@@ -67,11 +72,11 @@ class MobilePlayer(Mobile):
                 if target.object_data.object_type == ObjectType.NPC:
                     return {"moved": False, "message": self.greet(target)}
             else:
-                print(f"Entity {target.id} does not block movement.")
+                logger.debug("Entity %s does not block movement.", target.id)
                 if target.object_data.object_type == ObjectType.ITEM:
                     super().move(dx, dy, game)
-                    return {"moved": True, "message": self.pick_up(cast(Reference[Item], target), game.world.references)}
-                print(f"Moving onto non-blocking entity at ({new_x}, {new_y})")
+                    return {"moved": True, "message": self.pick_up(cast(Reference[Item], target), game.world)}
+                logger.debug("Moving onto non-blocking entity at (%d, %d)", new_x, new_y)
                 super().move(dx, dy, game)
                 game.world.reset_door()
 
@@ -80,17 +85,14 @@ class MobilePlayer(Mobile):
         game.world.reset_door()
         return {"moved": True}
 
-    def pick_up(self, item_ref: 'Reference[Item]', references: List['Reference']):
-        """Pick up an item and remove it from the world references"""
+    def pick_up(self, item_ref: 'Reference[Item]', world: 'GameMap'):
+        """Pick up an item and remove it from the map
+
+        GameMap.references is a list built from the entity store, so the
+        item is removed through the map, which also updates the spatial
+        index and the cell's layers.
+        """
         self.reference.object_data.inventory.add_item(
             item_id=item_ref.object_data.id)
-        references.remove(item_ref)
+        world.remove_reference(item_ref)
         return f"Picked up {item_ref.object_data.name}"
-
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-
-        # Avoid serializing the entire reference to prevent recursion
-        data['reference'] = self.reference.id
-
-        return data
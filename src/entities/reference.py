@@ -1,6 +1,7 @@
+import logging
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Optional, Union, TypeVar, Generic
-from core import Serializable
+from core.serializable import Serializable, NESTED, REF, TUPLE, VALUE
 from entities.activator import Activator
 from entities.door import Door
 
@@ -13,6 +14,8 @@ if TYPE_CHECKING:
     from game import Game
 
 
+logger = logging.getLogger(__name__)
+
 T_co = TypeVar('T_co', bound='PhysicalObject', covariant=True)
 
 
@@ -20,6 +23,11 @@ T_co = TypeVar('T_co', bound='PhysicalObject', covariant=True)
 class Reference(Serializable, Generic[T_co]):
     """Reference to a game object, such as Player, NPC, Item, or Door."""
 
+    # object_data is shared by every reference to the object, so it is saved by id
+    serializable_fields = {"id": VALUE, "x": VALUE, "y": VALUE, "mobile": NESTED,
+                           "locked": VALUE, "is_open": VALUE, "key_id": VALUE, "destination_map": VALUE,
+                           "destination_pos": TUPLE, "object_data": REF}
+
     def __init__(self, obj_id: str, x: int, y: int, object_data: T_co):
         super().__init__()
         self.id = obj_id
@@ -28,39 +36,45 @@ class Reference(Serializable, Generic[T_co]):
         self.object_data = object_data  # 关联的实体对象，如Player
         self.mobile: 'Mobile | MobilePlayer | None' = None  # 如果是可移动实体，则关联其移动组件
 
-        # Door specific attributes
+        # Door specific attributes; object_data is shared by every door, so their state lives here
         self.locked = False  # 默认门是未锁的
+        self.is_open = False
         self.key_id = None  # 默认没有钥匙ID
         self.destination_map: Optional[str] = None
         self.destination_pos: Optional[tuple] = None
 
-        self._serializable_exclude.add('object_data')  # 避免递归序列化
-
     def __str__(self):
         return self.id
 
+    @property
+    def blocks(self) -> bool:
+        """是否阻挡移动；打开的门不阻挡"""
+        return self.object_data.blocks and not self.is_open
+
+    @property
+    def char(self) -> Optional[str]:
+        """显示的字符；门按自身的开关状态显示"""
+        if isinstance(self.object_data, Door):
+            return self.object_data.open_char if self.is_open else self.object_data.close_char
+        return getattr(self.object_data, "char", None)
+
     def activate(self, game: 'Game', action_name: str | None = None) -> Union[str, None]:
         """激活该引用的对象，执行其动作"""
         if self.object_data.interactable is False:
             return
         if isinstance(self.object_data, Door):
-            print("activate door")
+            logger.debug("activate door %s", self.id)
             if self.locked:
                 return f"The {self.object_data.name} is locked."
-            if not self.object_data.blocks:
+            if self.is_open:
                 return
-            self.object_data.blocks = False
-            self.object_data.char = self.object_data.open_char
+            self.is_open = True
+            if game.world:
+                game.world.refresh_doors()
             return f"You open the {self.object_data.name}."
         if isinstance(self.object_data, Activator):
             actions = self.object_data.get_actions()
             if actions:
                 if not action_name:
                     action_name = actions[0]  # 默认执行第一个动作
-                return self.object_data.actions[action_name](game)
-
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        # Serialize the associated object_data by its ID
-        data['object_data'] = self.object_data.id
-        return data
+                return self.object_data.actions[action_name](self, game)
@@ -1,3 +1,4 @@
+from core.serializable import TUPLE, VALUE
 from entities.game_object import ObjectType
 from entities.physical_object import PhysicalObject
 
@@ -5,6 +6,8 @@ from entities.physical_object import PhysicalObject
 class Static(PhysicalObject):
     """静态物体（墙壁、地板等）"""
 
+    serializable_fields = {"char": VALUE, "color": TUPLE}
+
     def __init__(self, static_id: str, char: str, color: tuple, blocks: bool = True):
         super().__init__(static_id, ObjectType.STATIC, blocks=blocks, interactable=False)
         self.char = char
@@ -12,6 +15,3 @@ class Static(PhysicalObject):
 
     def __str__(self):
         return self.id
-
-    def to_dict(self) -> dict:
-        return super().to_dict()
@@ -1,7 +1,11 @@
 """主游戏循环与状态管理"""
 from enum import Enum, auto
-from typing import Optional, Tuple, Dict, Any
+import copy
+from typing import Optional, Tuple, Dict, Any, Mapping
+import json
+import logging
 import math
+import os
 import pygame
 
 from config.settings import (
@@ -15,20 +19,35 @@ from config.settings import (
     HEADER_HEIGHT,
     MENU_WIDTH,
     MENU_HEIGHT,
+    MSG_WIDTH,
+    MSG_HEIGHT,
     MAP_WIDTH,
+    MAP_HEIGHT,
     UI_WIDTH,
     UI_HEIGHT,
     INNER_PADDING,
-    OUTER_PADDING
+    OUTER_PADDING,
+    CHUNK_STORE_DIR,
+    PROFILER_CSV_PATH,
+    FPS_CAP,
+    IDLE_WAIT_MS,
+    MESSAGE_HISTORY_PATH,
+    AUTOSAVE_INTERVAL,
+    AUTOSAVE_SLOT,
 )
 from config import COLOR
 from data.object_manager import object_manager
-from data import create_activators
+from data import create_activators, create_statics
 from crafting import RecipeManager
 from entities import MobilePlayer, NPC, Player, Reference
-from ui import MessageLog, InteractionSystem, get_char_size, render_character, render_colored_text
-from world import GameMap, MAP_DATA
+from entities.game_object import ObjectType
+from ui import MessageLog, InteractionSystem, Compositor, Panel, glyph_cache, get_char_size, render_character, render_colored_text
+from world import GameMap, MAP_DATA, ChunkedWorld, ChunkStore
 from core import SaveLoadSystem
+from core.save_load import SAVE_COMPLETE_EVENT
+from utils import FrameProfiler, profiled
+
+logger = logging.getLogger(__name__)
 
 
 class GameState(Enum):
@@ -37,35 +56,82 @@ class GameState(Enum):
     INVENTORY = auto()
     CRAFTING = auto()
     JOURNAL = auto()
+    SAVE_MENU = auto()
+
+
+# 无界面模式下 step() 接受的动作名称
+ACTION_KEYS = {
+    "up": pygame.K_UP,
+    "down": pygame.K_DOWN,
+    "left": pygame.K_LEFT,
+    "right": pygame.K_RIGHT,
+    "look": pygame.K_l,
+    "inventory": pygame.K_i,
+    "journal": pygame.K_j,
+    "save": pygame.K_F5,
+    "saves": pygame.K_F9,
+    "start": pygame.K_RETURN,
+}
+
+# Window events after which the screen contents must be drawn again
+REDRAW_EVENTS = {pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED}
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless: bool = False, render: Optional[bool] = None):
+        """headless: run without a window (CI, load tests); render defaults to off when headless"""
+        self.headless = headless
+        self.render_enabled = not headless if render is None else render
+
         # 初始化 pygame 与主窗口
+        if headless:
+            # No display is needed (or available) on CI boxes
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption(GAME_TITLE)
+        if headless:
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption(GAME_TITLE)
         self.clock = pygame.time.Clock()
         self.running = True
+        self.turn = 0  # 已经过的回合数
+
+        # 按需重绘：只有状态被标记为已变化（或有动画）时才渲染
+        self.needs_redraw = True
+        self.animating = False  # 有动画时主循环按 FPS_CAP 逐帧重绘
+        self._drawn_log_revision = -1
+
+        # 逐帧分阶段计时（F3 显示统计，F4 导出CSV）
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
 
         # Initialize game states
         self.state = GameState.MAIN_MENU
         self.previous_state: Optional[GameState] = None
 
-        # 字体与字符尺寸
-        self.font = pygame.font.Font(
-            "assets/fonts/FT88-Gothique.ttf", FONT_SIZE)
-        self.char_size = get_char_size(self.font)
+        # 字体与字符尺寸（不渲染时无需加载字体）
+        if self.render_enabled:
+            self.font = pygame.font.Font(
+                "assets/fonts/FT88-Gothique.ttf", FONT_SIZE)
+            self.char_size = get_char_size(self.font)
+        else:
+            self.font = None
+            self.char_size = (FONT_SIZE // 2, FONT_SIZE)
 
         # 渲染用 surface 容器
         container_w = GRID_WIDTH * self.char_size[0]
         container_h = GRID_HEIGHT * self.char_size[1]
+        pad_w, pad_h = container_w + 2 * INNER_PADDING, container_h + 2 * INNER_PADDING
         self.surfaces = {}
         self.surfaces["game_container"] = pygame.Surface(
-            (container_w, container_h)).convert()
-        pad_w, pad_h = container_w + 2 * INNER_PADDING, container_h + 2 * INNER_PADDING
+            (container_w, container_h))
         self.surfaces["padding_container"] = pygame.Surface(
-            (pad_w, pad_h), pygame.SRCALPHA).convert_alpha()
+            (pad_w, pad_h), pygame.SRCALPHA)
+        if not headless:
+            # Converting to the display format needs a display
+            self.surfaces["game_container"] = self.surfaces["game_container"].convert()
+            self.surfaces["padding_container"] = self.surfaces["padding_container"].convert_alpha()
 
         # 初始化对象管理器
         self.object_manager = object_manager
@@ -77,20 +143,60 @@ class Game:
         self.world_state: dict = {"day": 1, "tasks": [], "progress": 0}
         self.recipe_manager = None
         self.journal = None
-        self.message_log = MessageLog(font=self.font, char_size=self.char_size)
+        # Headless simulations keep only the recent lines, without a history file
+        self.message_log = MessageLog(font=self.font, char_size=self.char_size,
+                                      history_path=None if headless else MESSAGE_HISTORY_PATH)
+
+        # 每个UI面板一张持久的 surface，输入变化时才重绘
+        self.compositor = Compositor()
+        self.create_panels()
         self.interaction_system: Optional[InteractionSystem] = None
         self.save_system = None
+        self.autosave_interval = 0 if headless else AUTOSAVE_INTERVAL  # 回合数，0为关闭
+        self.save_slots: list = []  # 存档浏览界面显示的存档摘要
+        self.selected_slot = 0
 
         # Sample map
         self.map_data = str(MAP_DATA.strip()).splitlines()
+        self.chunk_store_dir = CHUNK_STORE_DIR  # 大地图的区块目录（新游戏会清空）
+
+    def create_panels(self):
+        """Register the UI panels with their position, size, draw method and inputs"""
+        cw, ch = self.char_size
+        panels = {
+            "main_menu": Panel((0, 0), (GRID_WIDTH * cw, GRID_HEIGHT * ch),
+                               self.render_main_menu, lambda: None, background=COLOR.PARCHMENT),
+            "header": Panel((0, 0), (HEADER_WIDTH * cw, HEADER_HEIGHT * ch),
+                            self.render_header, lambda: self.world_state["day"]),
+            "status": Panel((MAP_WIDTH * cw, ch), (UI_WIDTH * cw, UI_HEIGHT * ch),
+                            self.render_status_panel, lambda: tuple(self.get_status_lines())),
+            "message_log": Panel((0, (HEADER_HEIGHT + MAP_HEIGHT) * ch), (MSG_WIDTH * cw, MSG_HEIGHT * ch),
+                                 self.render_message_log, lambda: self.message_log.revision),
+            "save_menu": Panel((0, HEADER_HEIGHT * ch), (GRID_WIDTH * cw, (GRID_HEIGHT - HEADER_HEIGHT) * ch),
+                               self.render_save_menu,
+                               lambda: (self.selected_slot, json.dumps(self.save_slots, sort_keys=True))),
+            "action_menu": Panel((0, (GRID_HEIGHT - MENU_HEIGHT) * ch), (MENU_WIDTH * cw, MENU_HEIGHT * ch),
+                                 self.render_action_menu, lambda: tuple(map(tuple, self.get_available_actions()))),
+        }
+        for name, panel in panels.items():
+            self.compositor.add_panel(name, panel)
 
     def initialize_game(self):
         """初始化所有游戏组件"""
+        # A save of the previous game may still be reading its chunk store
+        if self.save_system:
+            self.save_system.shutdown()
+
         # 1. 添加对象到游戏中 first
         self.add_objects_to_game()
 
-        # 2. Initialize the game map
-        self.world = GameMap(self.map_data)
+        # 2. Initialize the game map; maps larger than the screen are streamed in chunks
+        if len(self.map_data) > MAP_HEIGHT or max(map(len, self.map_data), default=0) > MAP_WIDTH:
+            chunked_world = ChunkedWorld.from_strings(
+                ChunkStore(self.chunk_store_dir), self.map_data)
+            self.world = GameMap.from_chunked_world(chunked_world)
+        else:
+            self.world = GameMap(self.map_data)
 
         # 2. Initialize the player at the starting position found in the map
         self.create_player(*self.world.player_start)
@@ -106,7 +212,8 @@ class Game:
         self.recipe_manager = RecipeManager()
         self.interaction_system = InteractionSystem(self)
 
-        # 4. Add starting messages
+        # 4. Add starting messages to a fresh history
+        self.message_log.clear()
         self.add_message(
             "> You enter the quiet workshop. Dust motes dance in the sunlight."
         )
@@ -132,10 +239,10 @@ class Game:
                 "Object data must be provided to create a reference.")
 
         # Player is a special case
-        obj_id = f"{obj.id}_{x}_{y}" if obj.id != "player" else "player"
+        obj_id = self.world.new_entity_id(obj) if obj.id != "player" else "player"
 
         reference = Reference(obj_id, x, y, object_data=obj)
-        self.world.references.append(reference)
+        self.world.add_reference(reference)
         return reference
 
     def create_player(self, x: int, y: int):
@@ -151,17 +258,32 @@ class Game:
 
     def add_objects_to_game(self):
         """向游戏添加对象"""
-        create_activators(self.object_manager)
-        print(f"Objects: {list(self.object_manager.objects.keys())}")
+        # The registry is process-wide; later games in the same process
+        # (e.g. headless simulations) reuse what the first one registered
+        if not self.object_manager.objects:
+            create_statics(self.object_manager)
+            create_activators(self.object_manager)
+        logger.debug("Objects: %s", list(self.object_manager.objects.keys()))
 
     def change_state(self, new_state):
         """Change the current game state"""
         self.previous_state = self.state
         self.state = new_state
+        self.invalidate()
+
+    def invalidate(self):
+        """Mark the screen as out of date; the next loop iteration redraws it"""
+        self.needs_redraw = True
+
+    def is_dirty(self) -> bool:
+        """Whether anything shown on screen changed since the last render"""
+        return (self.needs_redraw or self.animating
+                or self.message_log.revision != self._drawn_log_revision)
 
     def add_message(self, message, color=COLOR.INK):
         self.message_log.add_message(message, color)
 
+    @profiled
     def render(self):
         """Render the game"""
 
@@ -169,7 +291,7 @@ class Game:
         self.surfaces["game_container"].fill(COLOR.PARCHMENT)
 
         if self.state == GameState.MAIN_MENU:
-            self.render_main_menu()
+            self.compositor.compose(self.surfaces["game_container"], ["main_menu"])
         elif self.state == GameState.PLAYING:
             self.render_playing()
         elif self.state == GameState.INVENTORY:
@@ -178,12 +300,23 @@ class Game:
             self.render_crafting()
         elif self.state == GameState.JOURNAL:
             self.render_journal()
+        elif self.state == GameState.SAVE_MENU:
+            self.render_save_slots()
+
+        if self.show_profiler:
+            self.render_profiler_overlay()
 
         # Render framed container
         self.render_framed_container()
 
-        pygame.display.flip()
+        if not self.headless:
+            with self.profiler.phase("flip"):
+                pygame.display.flip()
+
+        self.needs_redraw = False
+        self._drawn_log_revision = self.message_log.revision
 
+    @profiled
     def render_framed_container(self):
         """Compose the framed container with padding and borders"""
         # Draw outer container
@@ -198,8 +331,9 @@ class Game:
         self.screen.blit(self.surfaces["padding_container"],
                          (OUTER_PADDING, OUTER_PADDING))
 
-    def render_main_menu(self):
-        """Render the main menu"""
+    @profiled
+    def render_main_menu(self, surface: pygame.Surface):
+        """Render the main menu (drawn once into its panel)"""
         # TODO: Design a better main menu
         main_menu_x, main_menu_y = 0, 0
         cw, ch = GRID_WIDTH * \
@@ -229,11 +363,11 @@ class Game:
             bg, self.font, GAME_TITLE, (0, 0))
         render_colored_text(
             bg, self.font, "Press ENTER to begin", (0, self.char_size[1]))
-        self.surfaces["game_container"].blit(
-            bg, (main_menu_x, main_menu_y))
+        surface.blit(bg, (main_menu_x, main_menu_y))
 
-        self.surfaces["game_container"].blit(bg, (main_menu_x, main_menu_y))
+        surface.blit(bg, (main_menu_x, main_menu_y))
 
+    @profiled
     def render_playing(self):
         """Render the playing state"""
         # Render game world
@@ -247,56 +381,82 @@ class Game:
         # Render UI elements
         self.render_ui_panel()
 
+    @profiled
     def render_inventory(self):
         """Render the inventory screen"""
-        self.render_header()
+        self.compositor.compose(self.surfaces["game_container"], ["header"])
         # TODO: Render inventory items
 
+    @profiled
     def render_crafting(self):
         """Render the crafting screen"""
-        self.render_header()
+        self.compositor.compose(self.surfaces["game_container"], ["header"])
         # TODO: Render crafting items
 
+    @profiled
     def render_journal(self):
         """Render the journal screen"""
-        self.render_header()
+        self.compositor.compose(self.surfaces["game_container"], ["header"])
         # TODO: Render journal entries
 
+    @profiled
+    def render_save_slots(self):
+        """Render the save slot browser"""
+        self.compositor.compose(self.surfaces["game_container"], ["header", "save_menu"])
+
+    @profiled
+    def render_save_menu(self, surface: pygame.Surface):
+        """Render the slot list from the metadata index (slot files are not opened)"""
+        lines = [("SAVE FILES", COLOR.SADDLE_BROWN), ""]
+        for index, info in enumerate(self.save_slots):
+            marker = "> " if index == self.selected_slot else "  "
+            name = "Autosave" if info["slot"] == AUTOSAVE_SLOT else f"Slot {info['slot']}"
+            if info["empty"]:
+                lines += [(f"{marker}{name}: [EMPTY SLOT]", COLOR.LIGHT_TAUPE), ""]
+                continue
+            if info.get("corrupt"):
+                lines += [(f"{marker}{name}: [CORRUPTED]", COLOR.LIGHT_TAUPE), ""]
+                continue
+            if info["incompatible"]:
+                lines += [(f"{marker}{name}: [INCOMPATIBLE VERSION {info['version']}]", COLOR.LIGHT_TAUPE), ""]
+                continue
+            skills = ", ".join(f"{skill} {level}" for skill, level in info["skills"].items())
+            saved = (info.get("timestamp") or "")[:16].replace("T", " ")
+            lines += [
+                (f"{marker}{name}: Day {info['day']}", COLOR.DARK_GREEN),
+                f"    Progress: {info['progress']}%" + (f" | {skills}" if skills else ""),
+                f"    Saved: {saved} | {info['size'] / 1024:.1f} KB",
+                "",
+            ]
+        lines.append(("(L)oad | (S)ave | (D)elete | (Esc) back", COLOR.SADDLE_BROWN))
+        for i, line in enumerate(lines):
+            text, color = line if isinstance(line, tuple) else (line, COLOR.INK)
+            render_colored_text(surface, self.font, text, (self.char_size[0], i * self.char_size[1]), color)
+
+    def refresh_save_slots(self):
+        """重新读取存档索引"""
+        if self.save_system:
+            self.save_slots = self.save_system.list_slots()
+            self.selected_slot = min(self.selected_slot, len(self.save_slots) - 1)
+
+    @profiled
     def render_ui_panel(self):
         """Render the UI panel for the playing state"""
-        self.render_header()
-        self.render_status_panel()
-        self.message_log.render(self.surfaces["game_container"])
-        self.render_action_menu()
+        self.compositor.compose(self.surfaces["game_container"],
+                                ["header", "status", "message_log", "action_menu"])
 
-    def render_header(self):
+    @profiled
+    def render_header(self, surface: pygame.Surface):
         """Render the top title section"""
-        # Draw container
-        header_x, header_y = 0, 0
-        header_bg = pygame.Surface(
-            (HEADER_WIDTH * self.char_size[0],
-             HEADER_HEIGHT * self.char_size[1]),
-            pygame.SRCALPHA,
-        )
         # Display game title and current day
         render_colored_text(
-            header_bg, self.font, f"{GAME_TITLE} - Day {self.world_state['day']}", (0, 0))
+            surface, self.font, f"{GAME_TITLE} - Day {self.world_state['day']}", (0, 0))
 
-        self.surfaces["game_container"].blit(header_bg, (header_x, header_y))
-
-    def render_status_panel(self):
-        """Render the status panel"""
-        # Draw UI panel background
-        ui_x, ui_y = MAP_WIDTH * self.char_size[0], self.char_size[1]
-        ui_bg = pygame.Surface(
-            (UI_WIDTH * self.char_size[0], UI_HEIGHT * self.char_size[1]),
-            pygame.SRCALPHA,
-        )
+    def get_status_lines(self) -> list:
+        """Lines of the status panel; plain strings or (text, color)"""
         if not self.player or not self.mobile_player:
-            return
-        # Player stats
-        status_y = 0
-        status = [
+            return []
+        return [
             "Location: ",
             (self.mobile_player.location, COLOR.DARK_GREEN),
             "",
@@ -307,11 +467,17 @@ class Game:
             *self.player.object_data.get_inventory_display(),
         ]
 
+    @profiled
+    def render_status_panel(self, surface: pygame.Surface):
+        """Render the status panel"""
+        # Player stats
+        status_y = 0
+
         # Draw stats with colored keywords
-        for stat in status:
+        for stat in self.get_status_lines():
             if isinstance(stat, Tuple):
                 render_colored_text(
-                    ui_bg,
+                    surface,
                     self.font,
                     stat[0],
                     (self.char_size[0], status_y),
@@ -319,10 +485,34 @@ class Game:
                 )
             else:
                 render_colored_text(
-                    ui_bg, self.font, stat, (self.char_size[0], status_y))
+                    surface, self.font, stat, (self.char_size[0], status_y))
             status_y += self.char_size[1]
 
-        self.surfaces["game_container"].blit(ui_bg, (ui_x, ui_y))
+    @profiled
+    def render_message_log(self, surface: pygame.Surface):
+        """Render the visible part of the message log"""
+        self.message_log.draw(surface)
+
+    @profiled
+    def render_profiler_overlay(self):
+        """Overlay the per-phase frame timings (avg/p95/max in ms) on the top right"""
+        rows = [("phase", "avg", "p95", "max")]
+        rows += [(name, f"{avg:.2f}", f"{p95:.2f}", f"{peak:.2f}")
+                 for name, avg, p95, peak in self.profiler.stats()]
+        char_w, char_h = self.char_size
+        name_cols = max(len(row[0]) for row in rows) + 1
+        width = (name_cols + 3 * 7) * char_w
+        overlay = pygame.Surface((width, len(rows) * char_h), pygame.SRCALPHA)
+        overlay.fill((*COLOR.PARCHMENT, 220))
+        for i, (name, *values) in enumerate(rows):
+            render_character(overlay, self.font, name, (0, i * char_h), COLOR.INK)
+            # Right-align each number in a 7-character column
+            for column, value in enumerate(values, 1):
+                text = glyph_cache.render(self.font, value, COLOR.INK, None)
+                right = (name_cols + column * 7) * char_w
+                overlay.blit(text, (right - text.get_width(), i * char_h))
+        container = self.surfaces["game_container"]
+        container.blit(overlay, (container.get_width() - width, 0))
 
     def get_current_task(self) -> str:
         """Get the current task from world state"""
@@ -347,7 +537,8 @@ class Game:
 
         return actions
 
-    def render_action_menu(self):
+    @profiled
+    def render_action_menu(self, surface: pygame.Surface):
         """Render the action menu"""
 
         actions = self.get_available_actions()
@@ -356,13 +547,7 @@ class Game:
         separator = "|"
 
         # 绘制动作菜单
-        menu_x, menu_y = 0, (GRID_HEIGHT - MENU_HEIGHT) * self.char_size[1]
-        current_x = menu_x
-
-        menu_bg = pygame.Surface(
-            (MENU_WIDTH * self.char_size[0], MENU_HEIGHT * self.char_size[1]),
-            pygame.SRCALPHA,
-        )
+        current_x = 0
 
         for i, action in enumerate(actions):
             # 提取键和文本
@@ -371,49 +556,116 @@ class Game:
 
             # 绘制首字母（深绿色）
             render_colored_text(
-                menu_bg, self.font, key, (current_x, 0), COLOR.SADDLE_BROWN
+                surface, self.font, key, (current_x, 0), COLOR.SADDLE_BROWN
             )
             current_x += len(key) * self.char_size[0]
 
             # 绘制剩余文本（浅灰褐色）
-            render_colored_text(menu_bg, self.font, text,
+            render_colored_text(surface, self.font, text,
                                 (current_x, 0), COLOR.LIGHT_TAUPE)
             current_x += (len(text) + 1) * self.char_size[0]
 
             # 如果不是最后一个动作，添加分隔符
             if i < len(actions) - 1:
                 render_colored_text(
-                    menu_bg, self.font, separator, (current_x,
+                    surface, self.font, separator, (current_x,
                                                     0), COLOR.LIGHT_TAUPE
                 )
             current_x += (len(separator) + 1) * self.char_size[0]
 
-        self.surfaces["game_container"].blit(menu_bg, (menu_x, menu_y))
-
-    def handle_events(self):
-        """Handle user input events"""
-        for event in pygame.event.get():
+    def wait_for_events(self) -> list:
+        """Collect pending events, sleeping while there is nothing to draw
+
+        When the screen is up to date the loop blocks in pygame.event.wait
+        instead of spinning; the timeout (IDLE_WAIT_MS) lets it wake up
+        now and then even without input. Returns [] on timeout.
+        """
+        if self.headless or self.is_dirty():
+            return pygame.event.get()
+        event = pygame.event.wait(IDLE_WAIT_MS)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event, *pygame.event.get()]
+
+    @profiled
+    def handle_events(self, events: Optional[list] = None):
+        """Handle user input events (pending events are fetched when none are given)"""
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             # Handle quit event first
             if event.type == pygame.QUIT:
                 self.running = False
                 break
 
+            # Key presses are the only input the states act on; key-ups,
+            # focus and mouse events leave the screen as it is. Messages
+            # mark it dirty through the message log revision.
+            if event.type == pygame.KEYDOWN or event.type in REDRAW_EVENTS:
+                self.invalidate()
+
+            # 后台存档完成，在主线程报告结果
+            if event.type == SAVE_COMPLETE_EVENT:
+                if self.save_system:
+                    self.save_system.poll()
+                if self.state == GameState.SAVE_MENU:
+                    self.refresh_save_slots()
+                    self.invalidate()
+                continue
+
             if event.type == pygame.KEYDOWN:
                 # 优先处理ESCAPE键
                 if event.key == pygame.K_ESCAPE:
+                    # Esc closes the save browser; everywhere else it quits
+                    if self.state == GameState.SAVE_MENU:
+                        self.change_state(GameState.PLAYING)
+                        continue
                     self.running = False
                     break
 
-            if self.state == GameState.MAIN_MENU:
-                self.handle_main_menu_events(event)
-            elif self.state == GameState.PLAYING:
-                self.handle_playing_events(event)
-            elif self.state == GameState.INVENTORY:
-                self.handle_inventory_events(event)
-            elif self.state == GameState.CRAFTING:
-                self.handle_crafting_events(event)
-            elif self.state == GameState.JOURNAL:
-                self.handle_journal_events(event)
+                # 性能分析快捷键在任何状态下都可用
+                if event.key == pygame.K_F3:
+                    self.show_profiler = not self.show_profiler
+                    continue
+                if event.key == pygame.K_F4:
+                    path = self.profiler.export_csv(PROFILER_CSV_PATH)
+                    self.add_message(f"Frame profile exported to {path}.")
+                    continue
+
+            self.dispatch_event(event)
+
+    def dispatch_event(self, event):
+        """Route an event to the handler of the current state"""
+        if self.state == GameState.MAIN_MENU:
+            self.handle_main_menu_events(event)
+        elif self.state == GameState.PLAYING:
+            self.handle_playing_events(event)
+        elif self.state == GameState.INVENTORY:
+            self.handle_inventory_events(event)
+        elif self.state == GameState.CRAFTING:
+            self.handle_crafting_events(event)
+        elif self.state == GameState.JOURNAL:
+            self.handle_journal_events(event)
+        elif self.state == GameState.SAVE_MENU:
+            self.handle_save_menu_events(event)
+
+    def step(self, action) -> int:
+        """Apply one action without the event loop and return the turn count
+
+        action is a pygame key code or a name from ACTION_KEYS. Used for
+        headless simulation; there is no frame cap, so turns run as fast
+        as the game logic allows.
+        """
+        key = ACTION_KEYS.get(action, action)
+        self.profiler.begin_frame()
+        with self.profiler.phase("handle_events"):
+            self.dispatch_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+            if self.save_system:
+                self.save_system.poll()
+        if self.render_enabled:
+            self.render()
+        self.profiler.end_frame()
+        return self.turn
 
     def handle_main_menu_events(self, event):
         """Handle events for the main menu state"""
@@ -459,11 +711,11 @@ class Game:
         }
 
         if event.key in move_keys and self.player and self.player.mobile:
-            print(f"Movement key pressed: {event.key}")
+            logger.debug("Movement key pressed: %s", event.key)
             dx, dy = move_keys[event.key]
-            print(f"Attempting to move by ({dx}, {dy})")
+            logger.debug("Attempting to move by (%d, %d)", dx, dy)
             result = self.player.mobile.move(dx, dy, self)
-            print(f"Move result: {result}")
+            logger.debug("Move result: %s", result)
             if result:  # Either moved or interacted
                 turn_passed = True
                 message = result.get("message")
@@ -482,6 +734,12 @@ class Game:
                 self.change_state(GameState.JOURNAL)
             return
 
+        elif event.key == pygame.K_F9:
+            if self.save_system:
+                self.refresh_save_slots()
+                self.change_state(GameState.SAVE_MENU)
+            return
+
         elif event.key == pygame.K_l:  # 查看
             self.look_around()
             return
@@ -498,9 +756,18 @@ class Game:
         # After handling a player action that passes a turn,
         # advance the world state
         if turn_passed and self.world and self.player:
-            self.world.compute_fov(self.player.x, self.player.y)
+            self.turn += 1
+            if self.world.needs_recenter(self.player.x, self.player.y):
+                self.world.recenter(self.player.x, self.player.y)
+            with self.profiler.phase("fov"):
+                self.world.compute_fov(self.player.x, self.player.y)
             self.handle_world_turns()
 
+            # Autosaves only snapshot the state here; the write happens in the background
+            if self.autosave_interval and self.save_system \
+                    and self.turn % self.autosave_interval == 0:
+                self.save_system.autosave()
+
         return self.running
 
     def handle_crafting_events(self, event):
@@ -515,6 +782,29 @@ class Game:
             if event.key == pygame.K_i:
                 self.change_state(GameState.PLAYING)
 
+    def handle_save_menu_events(self, event):
+        """Handle events for the save slot browser"""
+        if event.type != pygame.KEYDOWN or not self.save_system or not self.save_slots:
+            return
+        slot = self.save_slots[self.selected_slot]["slot"]
+        if event.key == pygame.K_UP:
+            self.selected_slot = (self.selected_slot - 1) % len(self.save_slots)
+        elif event.key == pygame.K_DOWN:
+            self.selected_slot = (self.selected_slot + 1) % len(self.save_slots)
+        elif event.key == pygame.K_l:
+            if not self.save_slots[self.selected_slot]["empty"]:
+                if self.save_system.load_game(slot):
+                    self.change_state(GameState.PLAYING)
+                else:
+                    # A failed checksum marks the slot in the index
+                    self.refresh_save_slots()
+        elif event.key == pygame.K_s:
+            # The list is refreshed when the background save completes
+            self.save_system.save_game(slot)
+        elif event.key == pygame.K_d:
+            self.save_system.delete_slot(slot)
+            self.refresh_save_slots()
+
     def handle_journal_events(self, event):
         """Handle events for the journal state"""
         if event.type == pygame.KEYDOWN:
@@ -535,6 +825,7 @@ class Game:
         self.add_message("Inventory:")
         self.add_message(player.get_inventory_display())
 
+    @profiled
     def handle_world_turns(self):
         """Process world turns after player moves"""
         if not self.world or not self.player:
@@ -542,8 +833,11 @@ class Game:
 
         messages = []
 
-        # iterate over a copy to avoid mutation issues
-        for ref in list(self.world.references):
+        # Only NPCs within detection range can act; one vectorized distance
+        # check over the entity store finds them
+        nearby = self.world.entities.within_radius(
+            self.player.x, self.player.y, 8, object_type=ObjectType.NPC)
+        for ref in nearby:
             # ensure the referenced object is an NPC and it's not the player reference
             if not isinstance(ref.object_data, NPC) or ref is self.player:
                 continue
@@ -557,33 +851,22 @@ class Game:
                 (ref.x - self.player.x) ** 2 + (ref.y - self.player.y) ** 2
             )
 
-            if distance <= 8:  # Detection range
-                if distance <= 1:  # Check if player is adjacent
-                    # Greets player
-                    result = ref.mobile.greet(self.player)
-                    messages.append(result)
-                else:
-                    # Move toward player using pathfinding
-                    new_x, new_y = self.world.find_path(
-                        ref.x, ref.y, self.player.x, self.player.y, self.world.references
-                    )
-
-                    # Only move if not blocked
-                    if not self.world.is_blocked(new_x, new_y):
-                        # Check if position is occupied
-                        occupied = False
-                        for other in self.world.references:
-                            if (
-                                other.object_data.blocks
-                                and other != ref
-                                and other.x == new_x
-                                and other.y == new_y
-                            ):
-                                occupied = True
-                                break
-
-                        if not occupied:
-                            ref.x, ref.y = new_x, new_y
+            if distance <= 1:  # Check if player is adjacent
+                # Greets player
+                result = ref.mobile.greet(self.player)
+                messages.append((result, COLOR.INK))
+            else:
+                # Step downhill on the shared flow field towards the player
+                step = self.world.flow_step(
+                    ref.x, ref.y, self.player.x, self.player.y)
+                if step is None:
+                    continue
+                new_x, new_y = step
+
+                # Only move if not blocked or occupied
+                if not self.world.is_blocked(new_x, new_y) \
+                        and not self.world.is_blocked_by_entity(new_x, new_y):
+                    self.world.move_reference(ref, new_x, new_y)
 
         # Add messages to log
         for msg, color in messages:
@@ -602,12 +885,7 @@ class Game:
             if game_map.is_blocked(nx, ny):
                 continue
             # Check if there's an actor in that position
-            occupied = False
-            for e in game_map.entities:
-                if e.blocks and e.x == nx and e.y == ny:
-                    occupied = True
-                    break
-            if occupied:
+            if game_map.is_blocked_by_entity(nx, ny):
                 continue
 
             dist = (nx - target_x) ** 2 + (ny - target_y) ** 2
@@ -616,27 +894,86 @@ class Game:
                 best_move = (nx, ny)
 
         # Move the entity
-        entity.x, entity.y = best_move
+        game_map.move_reference(entity, *best_move)
 
     def run(self):
         """Run the main game loop"""
         while self.running:
+            # Sleep until there is input or something to redraw
+            events = self.wait_for_events()
+            if not events and not self.is_dirty():
+                continue
+
+            self.profiler.begin_frame()
+
             # Handle events
-            self.handle_events()
+            self.handle_events(events)
 
-            # Render everything
-            self.render()
+            # Render only what changed since the last frame
+            if self.render_enabled and self.is_dirty():
+                self.render()
+
+            self.profiler.end_frame()
 
-            # Cap at 60 FPS
-            self.clock.tick(60)
+            # Cap the frame rate (matters while animating); headless runs are uncapped
+            if not self.headless:
+                self.clock.tick(FPS_CAP)
 
+        # Finish saves still being written before exiting
+        if self.save_system:
+            self.save_system.shutdown()
+        self.message_log.close()
         pygame.quit()
 
-    def to_dict(self) -> Dict[str, Any]:
+    def from_dict(self, data: Mapping[str, Any]):
+        """Restore a saved game into the running one
+
+        data is shaped like a finished save (a LazyGameData mapping reads each
+        section from the slot file when it is accessed). Every section is
+        read and decoded before the game is touched, so a bad save raises
+        with the running game unchanged.
+        """
+        if self.world is None:
+            raise ValueError("World must be initialized before loading a save.")
+
+        world_data = data["world"]
+        world_delta = self.world.decode_delta(world_data, self.map_data) if world_data is not None else None
+
+        # The player is saved apart from the map; rebuild it and relink by id
+        player_data = data["mobile_player"]
+        player = mobile_player = None
+        if player_data is not None:
+            player = Reference("player", player_data["x"], player_data["y"], object_data=Player())
+            mobile_player = MobilePlayer(player.x, player.y, player)
+            mobile_player.from_dict(player_data, {"player": player}.__getitem__)
+
+        world_state = dict(data["world_state"])
+        log_data = data["message_log"]
+        log_lines = MessageLog.decode_lines(log_data) if log_data is not None else None
+
+        if world_delta is not None:
+            self.world.apply_delta(world_delta)
+        if player is not None:
+            self.player, self.mobile_player = player, mobile_player
+            self.world.add_reference(self.player)
+            self.world.compute_fov(self.player.x, self.player.y)
+        self.world_state = world_state
+        if log_lines is not None:
+            self.message_log.restore_lines(log_lines)
+        self.compositor.invalidate()
+        self.invalidate()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The state a save needs, taken on the main thread
+
+        Only what the game keeps mutating is copied (map layers, entity
+        records, the player's and world's dicts); the save worker turns
+        the map snapshot into a delta (SaveLoadSystem.finish_save_data).
+        """
         return {
-            "world": self.world.to_dict() if self.world else None,
-            "mobile_player": self.mobile_player.to_dict() if self.mobile_player else None,
-            "world_state": self.world_state,
-            # The message log does not have a to_dict method, so we save the raw messages
-            "message_log": self.message_log.messages if self.message_log else [],
+            "world": self.world.snapshot(self.map_data) if self.world else None,
+            "mobile_player": copy.deepcopy(self.mobile_player.to_dict()) if self.mobile_player else None,
+            "world_state": copy.deepcopy(self.world_state),
+            # Only the recent lines; the full history stays in the history file
+            "message_log": self.message_log.to_dict() if self.message_log else None,
         }
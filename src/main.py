@@ -1,7 +1,16 @@
 """游戏入口点，初始化游戏并启动主循环"""
+import logging
 from game import Game
+from utils import setup_logging, dump_ring_buffer
 
 
 if __name__ == "__main__":
+    setup_logging()
     game = Game()
-    game.run()
+    try:
+        game.run()
+    except Exception:
+        logging.getLogger(__name__).exception("Unhandled error")
+        # Write the recent log records out next to the traceback
+        dump_ring_buffer()
+        raise
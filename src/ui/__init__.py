@@ -1,5 +1,10 @@
 from ui.messasge_log import MessageLog
 from ui.interaction_system import InteractionSystem
-from ui.text_renderer import get_char_size, render_character, render_colored_text
+from ui.glyph_cache import GlyphCache, glyph_cache
+from ui.compositor import Compositor, Panel
+from ui.text_renderer import (get_char_size, render_character, render_colored_text, dim_color,
+                              TextLayoutCache, text_layout_cache)
 
-__all__ = ["MessageLog", "InteractionSystem", "get_char_size", "render_character", "render_colored_text"]
+__all__ = ["MessageLog", "InteractionSystem", "GlyphCache", "glyph_cache", "Compositor", "Panel",
+           "get_char_size", "render_character", "render_colored_text", "dim_color",
+           "TextLayoutCache", "text_layout_cache"]
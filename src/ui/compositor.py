@@ -0,0 +1,63 @@
+"""分层合成：每个面板保留一张 surface，只在其输入变化时重绘"""
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+import pygame
+
+_UNSET = object()
+
+
+class Panel:
+    """A persistent panel surface
+
+    draw(surface) paints the panel from scratch; key() returns the inputs
+    the panel depends on (day, task, inventory...). The panel is only
+    redrawn when the key changes or it is invalidated.
+    """
+
+    def __init__(self, position: Tuple[int, int], size: Tuple[int, int],
+                 draw: Callable[[pygame.Surface], None], key: Callable[[], Hashable],
+                 background: Optional[Tuple[int, int, int]] = None):
+        self.position = position
+        self.draw = draw
+        self.key = key
+        self.background = background  # None: transparent panel
+        if background is None:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        else:
+            self.surface = pygame.Surface(size)
+        self._key = _UNSET
+
+    def refresh(self) -> bool:
+        """必要时重绘，返回是否重绘"""
+        key = self.key()
+        if key == self._key:
+            return False
+        self.surface.fill(self.background or (0, 0, 0, 0))
+        self.draw(self.surface)
+        self._key = key
+        return True
+
+    def invalidate(self):
+        self._key = _UNSET
+
+
+class Compositor:
+    """按层次合成面板；一帧只是若干次 blit"""
+
+    def __init__(self):
+        self.panels: Dict[str, Panel] = {}
+
+    def add_panel(self, name: str, panel: Panel) -> Panel:
+        self.panels[name] = panel
+        return panel
+
+    def compose(self, target: pygame.Surface, names: Iterable[str]):
+        """按顺序刷新并绘制指定面板（后绘制的在上层）"""
+        for name in names:
+            panel = self.panels[name]
+            panel.refresh()
+            target.blit(panel.surface, panel.position)
+
+    def invalidate(self, name: Optional[str] = None):
+        """强制重绘一个面板（name为None时为全部面板）"""
+        for panel in ([self.panels[name]] if name else self.panels.values()):
+            panel.invalidate()
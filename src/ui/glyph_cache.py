@@ -0,0 +1,50 @@
+"""Shared cache of rasterized glyphs and words"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import pygame
+from config.settings import GLYPH_CACHE_SIZE
+
+
+class GlyphCache:
+    """按 (字体, 文本, 颜色, 背景色, 抗锯齿, 透明度) 缓存渲染结果的LRU表"""
+
+    def __init__(self, max_size: int = GLYPH_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces: 'OrderedDict[tuple, pygame.Surface]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font: pygame.font.Font, text: str, color: Tuple[int, int, int],
+               background: Optional[Tuple[int, int, int]] = None, antialias: bool = False,
+               alpha: Optional[int] = None) -> pygame.Surface:
+        """Return the rendered surface for text, rasterizing it only on a miss
+
+        The returned surface is shared; callers must not draw on it.
+        """
+        key = (font, text, color, background, antialias, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color, background)
+        if alpha is not None and alpha < 255:
+            surface.set_alpha(alpha)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """清空缓存（例如更换字体后）"""
+        self.surfaces.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """获取命中/未命中计数"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces)}
+
+
+glyph_cache = GlyphCache()
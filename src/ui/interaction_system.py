@@ -52,15 +52,15 @@ class InteractionSystem:
             x, y = self.game.player.x + dx, self.game.player.y + dy
 
             # Check for objects at this position
-            for ref in self.world.references:
-                if ref.x == x and ref.y == y:
-                    # Check if the object has a get_actions method
-                    if hasattr(ref, "get_actions") and action_type in ref.object.get_actions():
-                        # 为每个对象生成唯一的选择键
-                        key = self.get_unique_key(ref.name, targets)
-                        used_keys.add(key)
-                        targets.append({"key": key, "object": ref,
-                                        "position": (x, y), "name": ref.name})
+            for ref in self.world.get_entities_at(x, y):
+                # Check if the object has a get_actions method
+                if hasattr(ref.object_data, "get_actions") and action_type in ref.object_data.get_actions():
+                    # 为每个对象生成唯一的选择键
+                    name = ref.object_data.name
+                    key = self.get_unique_key(name, used_keys)
+                    used_keys.add(key)
+                    targets.append({"key": key, "object": ref,
+                                    "position": (x, y), "name": name})
 
         return targets, used_keys
 
@@ -128,7 +128,7 @@ class InteractionSystem:
 
     def perform_action(self, target_object):
         """在目标对象上执行交互动作"""
-        result = target_object.activate(self.interaction_mode, self.game)
+        result = target_object.activate(self.game, self.interaction_mode)
         if result:
             self.game.add_message(result)
         self.cancel_interaction()
@@ -1,23 +1,57 @@
+import json
+import os
+from array import array
+from collections import deque
+from typing import List, Optional, Tuple
 import pygame
 from config import COLOR
-from config.settings import GRID_WIDTH, HEADER_HEIGHT, MAP_HEIGHT, MSG_WIDTH, MSG_HEIGHT
+from config.settings import (GRID_WIDTH, HEADER_HEIGHT, MAP_HEIGHT, MSG_WIDTH, MSG_HEIGHT,
+                             MESSAGE_HISTORY_PATH, MESSAGE_HISTORY_PAGE, MESSAGE_HISTORY_MAX_LINES)
 from ui.text_renderer import render_colored_text
 
 
 class MessageLog:
-    def __init__(self, font, char_size):
+    """消息日志：最近的行保存在内存环形缓冲区中，完整历史追加写入磁盘
+
+    Every line gets a global index. The newest `max_lines` lines live in
+    `messages` (a deque); all lines are appended to the history file, and
+    `offsets` maps a line index (counted from `history_start`) to its byte
+    offset there, so scrolling back pages older lines in from disk. The
+    history belongs to the current game: the file is truncated on startup,
+    on a new game and on load, and once it holds MESSAGE_HISTORY_MAX_LINES
+    lines the oldest half is dropped. Without a history file only the
+    recent lines are kept.
+    """
+
+    def __init__(self, font, char_size, history_path: Optional[str] = MESSAGE_HISTORY_PATH):
         self.font = font
         self.char_width, self.char_height = char_size
         # Initialize empty game messages
-        self.messages = []
         self.max_lines = MSG_HEIGHT * 3
-        self.scroll_offset = 0
+        self.messages: 'deque[Tuple[str, tuple]]' = deque(maxlen=self.max_lines)
+        self.total_lines = 0  # 包括只在磁盘上的行
+        self.scroll_offset = 0  # 第一行可见消息的全局行号
+        self.revision = 0  # 内容或滚动位置变化时递增，用于判断是否需要重绘
+
+        # Append-only history file and its line-offset index
+        self.history_path = history_path
+        self.offsets = array("q")
+        self.history_start = 0  # 历史文件第一行的全局行号
+        self._history = None
+        self._history_size = 0
+        self._page: Tuple[int, List[Tuple[str, tuple]]] = (0, [])  # 最近读取的历史页
+        if history_path:
+            directory = os.path.dirname(history_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._history = open(history_path, "w+b")
 
     def add_message(self, message, color=COLOR.INK):
         """Add a message to the log with wrapping and coloring"""
+        self.revision += 1
 
         if message == "":
-            self.messages.append(("", color))
+            self.append_line("", color)
             return
 
         # 分割消息以适应宽度
@@ -25,15 +59,124 @@ class MessageLog:
 
         # Add all lines to message log
         for line in lines:
-            self.messages.append((line, color))
-
-        # Keep message log manageable
-        if len(self.messages) > self.max_lines:
-            self.messages = self.messages[-self.max_lines:]
+            self.append_line(line, color)
 
         # Auto-scroll to bottom
         self.scroll_to_bottom()
 
+    def append_line(self, line: str, color: tuple):
+        """加入一行：放入环形缓冲区，并追加到历史文件"""
+        self.messages.append((line, color))
+        if self._history is not None:
+            if len(self.offsets) >= MESSAGE_HISTORY_MAX_LINES:
+                self.rotate_history()
+            record = (json.dumps([line, list(color)], ensure_ascii=False) + "\n").encode("utf-8")
+            self._history.seek(self._history_size)
+            self._history.write(record)
+            self.offsets.append(self._history_size)
+            self._history_size += len(record)
+        self.total_lines += 1
+
+    def rotate_history(self):
+        """Drop the oldest half of the history file
+
+        The kept lines are moved to the start of the file; global line
+        indices are unchanged, the dropped ones just fall before
+        `first_line`.
+        """
+        assert self._history is not None
+        drop = len(self.offsets) - MESSAGE_HISTORY_MAX_LINES // 2
+        base = self.offsets[drop]
+        self._history.flush()
+        self._history.seek(base)
+        data = self._history.read(self._history_size - base)
+        self._history.seek(0)
+        self._history.write(data)
+        self._history.truncate()
+        self.offsets = array("q", (offset - base for offset in self.offsets[drop:]))
+        self.history_start += drop
+        self._history_size = len(data)
+        self._page = (0, [])
+        self.scroll_offset = max(self.first_line, self.scroll_offset)
+
+    def clear(self):
+        """清空所有行并截断历史文件"""
+        self.revision += 1
+        self.messages.clear()
+        self.total_lines = 0
+        self.scroll_offset = 0
+        self.offsets = array("q")
+        self.history_start = 0
+        self._history_size = 0
+        self._page = (0, [])
+        if self._history is not None:
+            self._history.seek(0)
+            self._history.truncate()
+
+    @property
+    def first_line(self) -> int:
+        """仍可访问的最早一行的行号"""
+        if self._history is not None:
+            return self.history_start
+        return self.total_lines - len(self.messages)
+
+    def get_lines(self, start: int, count: int) -> List[Tuple[str, tuple]]:
+        """Lines start..start+count by global index, paging old ones in from disk"""
+        start = max(start, self.first_line)
+        end = min(start + count, self.total_lines)
+        recent_start = self.total_lines - len(self.messages)
+        lines = []
+        for index in range(start, end):
+            if index >= recent_start:
+                lines.append(self.messages[index - recent_start])
+            else:
+                lines.append(self.read_history_line(index))
+        return lines
+
+    def read_history_line(self, index: int) -> Tuple[str, tuple]:
+        """从历史文件读取一行；一次读取并缓存包含它的整页"""
+        index -= self.history_start
+        page_start, page = self._page
+        if not page_start <= index < page_start + len(page):
+            page_start = index - index % MESSAGE_HISTORY_PAGE
+            page_end = min(page_start + MESSAGE_HISTORY_PAGE, len(self.offsets))
+            assert self._history is not None
+            self._history.flush()
+            self._history.seek(self.offsets[page_start])
+            end = self.offsets[page_end] if page_end < len(self.offsets) else self._history_size
+            data = self._history.read(end - self.offsets[page_start])
+            page = [(text, tuple(color)) for text, color in map(json.loads, data.splitlines())]
+            self._page = (page_start, page)
+        return page[index - page_start]
+
+    def close(self):
+        """关闭历史文件"""
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+
+    def to_dict(self) -> dict:
+        """只保存最近的行；更早的历史不随存档保存"""
+        return {
+            "recent": [[line, list(color)] for line, color in self.messages],
+        }
+
+    @staticmethod
+    def decode_lines(data: dict) -> List[Tuple[str, tuple]]:
+        """to_dict() 保存的行 -> (text, color) 列表"""
+        return [(str(line), tuple(color)) for line, color in data.get("recent", [])]
+
+    def restore_lines(self, lines: List[Tuple[str, tuple]]):
+        """Replace the log with decoded lines and scroll to them
+
+        The history of the game played before the load is discarded, so
+        the restored lines are written to the history exactly once.
+        """
+        self.clear()
+        for line, color in lines:
+            self.append_line(line, color)
+        self.scroll_to_bottom()
+
     def split_message(self, message):
         # Split long messages into chunks that fit in the message area
         max_chars = GRID_WIDTH  # Max characters per line
@@ -72,16 +215,19 @@ class MessageLog:
 
     def scroll_to_bottom(self):
         """Scroll to the bottom of the message log"""
-        self.scroll_offset = max(0, len(self.messages) - MSG_HEIGHT)
+        self.revision += 1
+        self.scroll_offset = max(self.first_line, self.total_lines - MSG_HEIGHT)
 
     def scroll_up(self):
         """Scroll up one line"""
-        self.scroll_offset = max(0, self.scroll_offset - 1)
+        self.revision += 1
+        self.scroll_offset = max(self.first_line, self.scroll_offset - 1)
 
     def scroll_down(self):
         """Scroll down one line"""
-        self.scroll_offset = min(len(self.messages) - MSG_HEIGHT,
-                                 self.scroll_offset + 1)
+        self.revision += 1
+        self.scroll_offset = max(self.first_line, min(self.total_lines - MSG_HEIGHT,
+                                                      self.scroll_offset + 1))
 
     def handle_input(self, key):
         """处理滚动输入"""
@@ -102,19 +248,17 @@ class MessageLog:
             (MSG_WIDTH * self.char_width, MSG_HEIGHT * self.char_height),
             pygame.SRCALPHA,
         )
+        self.draw(msg_bg)
+        container.blit(msg_bg, (msg_x, msg_y))
 
-        # Calculate visible messages
-        start_idx = self.scroll_offset
-        end_idx = min(start_idx + self.max_lines, len(self.messages))
-
+    def draw(self, surface):
+        """Draw the visible messages onto a message-area sized surface"""
         # Draw messages
-        for i, (msg, color) in enumerate(self.messages[start_idx:end_idx]):
+        for i, (msg, color) in enumerate(self.get_lines(self.scroll_offset, MSG_HEIGHT)):
             render_colored_text(
-                msg_bg,
+                surface,
                 self.font,
                 msg,
                 (0, i * self.char_height),
                 color,
             )
-
-        container.blit(msg_bg, (msg_x, msg_y))
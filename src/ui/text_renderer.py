@@ -1,44 +1,108 @@
 """Text rendering utilities for the game UI"""
 
-from typing import Tuple, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Tuple, Optional
 import pygame
 from config import COLOR, COLORED_WORDS, WALL, FLOOR
+from config.settings import TEXT_LAYOUT_CACHE_SIZE
+from ui.glyph_cache import glyph_cache
 
 
 def render_character(surface: pygame.Surface, font: pygame.font.Font, char: str, position: Tuple[int, int], color: Tuple[int, int, int] = COLOR.INK, background: Optional[Tuple[int, int, int]] = None, alpha: Optional[int] = None):
     """Render a single character at the given position"""
     x, y = position
-    char_surface = font.render(
-        char, False, color, background)
-    if alpha and alpha < 255:
-        char_surface.set_alpha(alpha)
+    char_surface = glyph_cache.render(
+        font, char, color, background, alpha=alpha or None)
     surface.blit(char_surface, (x, y))
     return char_surface.get_width()
 
 
 def render_colored_text(surface: pygame.Surface, font: pygame.font.Font, text: str, position: Tuple[int, int], default_color: Tuple[int, int, int] = COLOR.INK):
     """Render text with colored keywords"""
-    x, y = position
-    words = text.split()
-
-    for word in words:
-        # Check if word needs special coloring
-        color = COLORED_WORDS.get(word, default_color)
-
-        if not color:
-            # Handle punctuation
-            clean_word = word.strip(".,!?;:")
-            color = COLORED_WORDS.get(clean_word, default_color)
-
-        # Render the word
-        word_width = render_character(
-            surface, font, word, (x, y), color)
-
-        # Move to next position (add space width)
-        x += word_width + get_char_size(font)[0]
+    line = text_layout_cache.render(font, text, default_color)
+    if line is not None:
+        surface.blit(line, position)
 
 
 def get_char_size(font: pygame.font.Font) -> Tuple[int, int]:
     """Get the width and height of a single character"""
     width, height = font.size(WALL + FLOOR)  # Use a sample character
     return (int(width / 2), height)
+
+
+@lru_cache(maxsize=None)
+def dim_color(color: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Blend a colour halfway towards white (explored but out of sight)"""
+    return (
+        min(color[0] + (255 - color[0]) // 2, 255),
+        min(color[1] + (255 - color[1]) // 2, 255),
+        min(color[2] + (255 - color[2]) // 2, 255),
+    )
+
+
+class TextLayoutCache:
+    """Laid-out lines of colored text, cached per font
+
+    A line is tokenized, colored and measured once per (text, default
+    color); the word surfaces are composed into one line surface that is
+    blitted as a whole afterwards. Each font has its own LRU table.
+    """
+
+    def __init__(self, max_size: int = TEXT_LAYOUT_CACHE_SIZE):
+        self.max_size = max_size  # 每个字体缓存的行数
+        self.lines: Dict[pygame.font.Font, 'OrderedDict[tuple, Optional[pygame.Surface]]'] = {}
+
+    def render(self, font: pygame.font.Font, text: str,
+               default_color: Tuple[int, int, int] = COLOR.INK) -> Optional[pygame.Surface]:
+        """Return the composed line surface (None for blank text); callers must not draw on it"""
+        lines = self.lines.get(font)
+        if lines is None:
+            lines = self.lines[font] = OrderedDict()
+        key = (text, default_color)
+        if key in lines:
+            lines.move_to_end(key)
+            return lines[key]
+
+        line = self.layout(font, text, default_color)
+        lines[key] = line
+        if len(lines) > self.max_size:
+            lines.popitem(last=False)
+        return line
+
+    @staticmethod
+    def layout(font: pygame.font.Font, text: str,
+               default_color: Tuple[int, int, int]) -> Optional[pygame.Surface]:
+        """分词、着色并排版一行文本"""
+        words = []
+        for word in text.split():
+            # Check if word needs special coloring
+            color = COLORED_WORDS.get(word, default_color)
+
+            if not color:
+                # Handle punctuation
+                clean_word = word.strip(".,!?;:")
+                color = COLORED_WORDS.get(clean_word, default_color)
+            words.append(glyph_cache.render(font, word, color))
+        if not words:
+            return None
+
+        # Words are separated by one character width
+        space = get_char_size(font)[0]
+        width = sum(word.get_width() for word in words) + space * (len(words) - 1)
+        line = pygame.Surface((width, max(word.get_height() for word in words)), pygame.SRCALPHA)
+        x = 0
+        for word in words:
+            line.blit(word, (x, 0))
+            x += word.get_width() + space
+        return line
+
+    def invalidate(self, font: Optional[pygame.font.Font] = None):
+        """丢弃某个字体（None为所有字体）的排版结果"""
+        if font is None:
+            self.lines.clear()
+        else:
+            self.lines.pop(font, None)
+
+
+text_layout_cache = TextLayoutCache()
@@ -0,0 +1,4 @@
+from utils.profiler import FrameProfiler, profiled
+from utils.log import RingBufferHandler, setup_logging, dump_ring_buffer
+
+__all__ = ["FrameProfiler", "profiled", "RingBufferHandler", "setup_logging", "dump_ring_buffer"]
@@ -0,0 +1,77 @@
+"""日志配置：控制台输出与可选的内存环形缓冲区（崩溃时导出）
+
+Modules log through `logging.getLogger(__name__)` with %-style arguments,
+so a disabled level costs one cached level check and the message is never
+formatted.
+"""
+import logging
+import os
+from collections import deque
+from typing import Deque, Optional
+from config.settings import (LOG_LEVEL, LOG_RING_BUFFER_SIZE, LOG_RING_BUFFER_LEVEL,
+                             LOG_CRASH_DUMP_PATH)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records in memory
+
+    Records are only formatted when dumped, so keeping them is cheap.
+    """
+
+    def __init__(self, capacity: int, level: 'int | str' = logging.DEBUG):
+        super().__init__(level)
+        self.records: Deque[logging.LogRecord] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+    def dump(self, path: str = LOG_CRASH_DUMP_PATH):
+        """把缓冲区中的记录写入文件"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in list(self.records):
+                f.write(self.format(record) + "\n")
+
+
+ring_buffer: Optional[RingBufferHandler] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, ring_buffer_size: int = LOG_RING_BUFFER_SIZE,
+                  ring_buffer_level: str = LOG_RING_BUFFER_LEVEL) -> logging.Logger:
+    """Configure the root logger; calling it again replaces the previous setup
+
+    The root level is the lowest level any sink wants, so records below
+    it are dropped before they are created.
+    """
+    global ring_buffer
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(console)
+    root_level = console.level
+
+    ring_buffer = None
+    if ring_buffer_size > 0:
+        ring_buffer = RingBufferHandler(ring_buffer_size, ring_buffer_level)
+        ring_buffer.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(ring_buffer)
+        root_level = min(root_level, ring_buffer.level)
+
+    root.setLevel(root_level)
+    return root
+
+
+def dump_ring_buffer(path: str = LOG_CRASH_DUMP_PATH) -> bool:
+    """导出环形缓冲区（未启用时返回False）"""
+    if ring_buffer is None:
+        return False
+    ring_buffer.dump(path)
+    return True
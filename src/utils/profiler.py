@@ -0,0 +1,88 @@
+"""逐帧分阶段计时：环形缓冲区、统计与CSV导出"""
+import csv
+import functools
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Tuple
+import numpy as np
+from config.settings import PROFILER_HISTORY
+
+
+class FrameProfiler:
+    """Records the wall time of each named phase, one sample dict per frame
+
+    Phases may nest (render_playing contains render_ui_panel); each phase
+    reports its inclusive time, and a phase entered several times in one
+    frame is summed. Only the last `history` frames are kept.
+    """
+
+    def __init__(self, history: int = PROFILER_HISTORY):
+        self.frames: Deque[Dict[str, float]] = deque(maxlen=history)  # 环形缓冲区
+        self.current: Dict[str, float] = {}
+        self.frame_count = 0
+
+    def begin_frame(self):
+        self.current = {}
+
+    def end_frame(self):
+        """把当前帧的样本存入缓冲区（没有任何阶段的帧不记录）"""
+        if self.current:
+            self.frames.append(self.current)
+            self.frame_count += 1
+        self.current = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """计时一个阶段（毫秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.current[name] = self.current.get(name, 0.0) + elapsed
+
+    def phase_names(self) -> List[str]:
+        """按首次出现顺序排列的所有阶段名"""
+        names: Dict[str, None] = {}
+        for frame in self.frames:
+            names.update(dict.fromkeys(frame))
+        return list(names)
+
+    def stats(self) -> List[Tuple[str, float, float, float]]:
+        """每个阶段的 (名称, 平均, p95, 最大)，单位毫秒"""
+        rows = []
+        for name in self.phase_names():
+            samples = np.array([frame[name] for frame in self.frames if name in frame])
+            rows.append((name, float(samples.mean()), float(np.percentile(samples, 95)),
+                         float(samples.max())))
+        return rows
+
+    def export_csv(self, path: str) -> str:
+        """Write one row per buffered frame, one column per phase (ms); returns the path"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        names = self.phase_names()
+        first_frame = self.frame_count - len(self.frames)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", *names])
+            for index, frame in enumerate(self.frames, first_frame):
+                writer.writerow([index, *(f"{frame[name]:.4f}" if name in frame else ""
+                                          for name in names)])
+        return path
+
+    def clear(self):
+        self.frames.clear()
+        self.current = {}
+
+
+def profiled(method):
+    """Time a Game method as a phase named after it (needs self.profiler)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.profiler.phase(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
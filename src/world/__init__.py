@@ -1,4 +1,5 @@
 from world.game_map import GameMap
+from world.chunks import Chunk, ChunkStore, ChunkedWorld
 from world.map_data import MAP_DATA
 
-__all__ = ["GameMap", "MAP_DATA"]
+__all__ = ["GameMap", "Chunk", "ChunkStore", "ChunkedWorld", "MAP_DATA"]
@@ -0,0 +1,304 @@
+"""分块存储的大地图：常驻玩家附近的区块，其余区块保存在磁盘上"""
+import io
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from config import PLAYER
+from config.settings import CHUNK_SIZE, CHUNK_LOAD_RADIUS
+from world.tiles import TILE_VOID, FIXTURE_CHARS, parse_map_row
+
+
+@dataclass
+class Chunk:
+    """CHUNK_SIZE x CHUNK_SIZE 的地图区块，数组按 [x, y] 索引"""
+    cx: int
+    cy: int
+    tile_ids: np.ndarray = field(
+        default_factory=lambda: np.full((CHUNK_SIZE, CHUNK_SIZE), TILE_VOID, dtype=np.uint8))
+    explored: np.ndarray = field(
+        default_factory=lambda: np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=bool))
+    # Entity records in world coordinates: {"object_data": id, "x": .., "y": .., ["actor": True]}
+    entities: List[dict] = field(default_factory=list)
+    dirty: bool = False  # 是否有未写回磁盘的修改
+
+    def copy(self) -> 'Chunk':
+        return Chunk(self.cx, self.cy, self.tile_ids.copy(), self.explored.copy(),
+                     [dict(record) for record in self.entities], self.dirty)
+
+
+class ChunkStore:
+    """磁盘上的区块存储，每个区块一个 .npz 文件"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def chunk_path(self, cx: int, cy: int) -> str:
+        return os.path.join(self.directory, f"chunk_{cx}_{cy}.npz")
+
+    def save(self, chunk: Chunk):
+        """写入区块"""
+        np.savez_compressed(
+            self.chunk_path(chunk.cx, chunk.cy),
+            tile_ids=chunk.tile_ids,
+            explored=chunk.explored,
+            entities=np.array(json.dumps(chunk.entities)),
+        )
+        chunk.dirty = False
+
+    def load(self, cx: int, cy: int) -> Optional[Chunk]:
+        """读取区块，不存在时返回None"""
+        path = self.chunk_path(cx, cy)
+        if not os.path.exists(path):
+            return None
+        return self.decode(cx, cy, path)
+
+    def read_raw(self, cx: int, cy: int) -> Optional[bytes]:
+        """区块文件的原始字节（不解码），不存在时返回None"""
+        path = self.chunk_path(cx, cy)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def decode(cx: int, cy: int, source: 'str | io.BytesIO') -> Chunk:
+        """从文件路径或 read_raw() 的字节流解码区块"""
+        with np.load(source) as data:
+            return Chunk(cx, cy,
+                         tile_ids=data["tile_ids"],
+                         explored=data["explored"],
+                         entities=json.loads(str(data["entities"])))
+
+    def clear(self):
+        """删除所有区块文件"""
+        for filename in os.listdir(self.directory):
+            if filename.startswith("chunk_") and filename.endswith(".npz"):
+                os.remove(os.path.join(self.directory, filename))
+
+
+def import_chunk(map_strings: List[str], cx: int, cy: int) -> Chunk:
+    """The chunk (cx, cy) as ChunkedWorld.from_strings() imports it"""
+    chunk = Chunk(cx, cy)
+    if cx < 0 or cy < 0:
+        return chunk
+    left = cx * CHUNK_SIZE
+    for y in range(cy * CHUNK_SIZE, min((cy + 1) * CHUNK_SIZE, len(map_strings))):
+        tile_ids, special = parse_map_row(map_strings[y][left:left + CHUNK_SIZE])
+        chunk.tile_ids[:len(tile_ids), y % CHUNK_SIZE] = tile_ids
+        for x, char in special:
+            if char in FIXTURE_CHARS:
+                chunk.entities.append({"object_data": FIXTURE_CHARS[char], "x": left + x, "y": y})
+    return chunk
+
+
+class ChunkSnapshot:
+    """The chunks modified since the import, as of one moment, read on another thread
+
+    Resident chunks are copied when the snapshot is taken. Stored chunks
+    are read later by read(); if the world overwrites one before that,
+    preserve() keeps the old bytes first, so the snapshot never sees a
+    later state.
+    """
+
+    def __init__(self, store: ChunkStore, resident: Dict[Tuple[int, int], Chunk],
+                 stored: Set[Tuple[int, int]]):
+        self.store = store
+        self.resident = resident
+        self.pending = set(stored)  # 尚未读取的磁盘区块
+        self.files: Dict[Tuple[int, int], bytes] = {}
+        self.done = False
+        self._lock = threading.Lock()
+
+    def preserve(self, key: Tuple[int, int]):
+        """区块文件被覆盖之前调用（主线程）"""
+        with self._lock:
+            if key in self.pending:
+                self.pending.discard(key)
+                data = self.store.read_raw(*key)
+                if data is not None:
+                    self.files[key] = data
+
+    def read(self) -> List[Chunk]:
+        """All the chunks of the snapshot, ordered by key"""
+        for key in sorted(self.pending):
+            self.preserve(key)
+        self.done = True
+        chunks = dict(self.resident)
+        for (cx, cy), data in self.files.items():
+            chunks[(cx, cy)] = ChunkStore.decode(cx, cy, io.BytesIO(data))
+        return [chunks[key] for key in sorted(chunks)]
+
+
+class ChunkedWorld:
+    """按需加载/卸载区块的世界；内存占用只取决于常驻区块数量"""
+
+    def __init__(self, store: ChunkStore, load_radius: int = CHUNK_LOAD_RADIUS):
+        self.store = store
+        self.load_radius = load_radius
+        self.resident: Dict[Tuple[int, int], Chunk] = {}
+        self.player_start = (0, 0)
+        # Chunks written back since the import; the others still match the text map
+        self.modified: Set[Tuple[int, int]] = set()
+        self.snapshots: List[ChunkSnapshot] = []  # 保存中、尚未读完的快照
+
+    @classmethod
+    def from_strings(cls, store: ChunkStore, map_strings: List[str]) -> 'ChunkedWorld':
+        """Import a text map into the store one band of chunk rows at a time"""
+        store.clear()
+        world = cls(store)
+        for band_start in range(0, len(map_strings), CHUNK_SIZE):
+            band: Dict[int, Chunk] = {}
+            cy = band_start // CHUNK_SIZE
+            for y, row in enumerate(map_strings[band_start:band_start + CHUNK_SIZE], band_start):
+                tile_ids, special = parse_map_row(row)
+                for cx in range(0, len(row), CHUNK_SIZE):
+                    chunk = band.get(cx // CHUNK_SIZE)
+                    if chunk is None:
+                        chunk = band[cx // CHUNK_SIZE] = Chunk(cx // CHUNK_SIZE, cy)
+                    segment = tile_ids[cx:cx + CHUNK_SIZE]
+                    chunk.tile_ids[:len(segment), y % CHUNK_SIZE] = segment
+                for x, char in special:
+                    if char == PLAYER:
+                        world.player_start = (x, y)
+                    elif char in FIXTURE_CHARS:
+                        band[x // CHUNK_SIZE].entities.append(
+                            {"object_data": FIXTURE_CHARS[char], "x": x, "y": y})
+            for chunk in band.values():
+                store.save(chunk)
+        return world
+
+    @staticmethod
+    def chunk_key(x: int, y: int) -> Tuple[int, int]:
+        """世界坐标 -> 区块坐标"""
+        return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+    def get_chunk(self, cx: int, cy: int) -> Chunk:
+        """获取区块，必要时从磁盘加载；从未写入过的区块视为空白"""
+        chunk = self.resident.get((cx, cy))
+        if chunk is None:
+            chunk = self.store.load(cx, cy) or Chunk(cx, cy)
+            self.resident[(cx, cy)] = chunk
+        return chunk
+
+    def update_focus(self, x: int, y: int):
+        """加载焦点附近的区块，并把其余区块写回磁盘后卸载"""
+        focus_cx, focus_cy = self.chunk_key(x, y)
+        wanted = {
+            (focus_cx + dx, focus_cy + dy)
+            for dx in range(-self.load_radius, self.load_radius + 1)
+            for dy in range(-self.load_radius, self.load_radius + 1)
+        }
+        for key in list(self.resident):
+            if key not in wanted:
+                self.unload(key)
+        for key in wanted:
+            self.get_chunk(*key)
+
+    def unload(self, key: Tuple[int, int]):
+        chunk = self.resident.pop(key)
+        if chunk.dirty:
+            self.save_chunk(chunk)
+
+    def flush(self):
+        """将所有常驻区块的修改写回磁盘"""
+        for chunk in self.resident.values():
+            if chunk.dirty:
+                self.save_chunk(chunk)
+
+    def save_chunk(self, chunk: Chunk):
+        key = (chunk.cx, chunk.cy)
+        self.snapshots = [snapshot for snapshot in self.snapshots if not snapshot.done]
+        for snapshot in self.snapshots:
+            snapshot.preserve(key)
+        self.store.save(chunk)
+        self.modified.add(key)
+
+    def snapshot(self, origin: Tuple[int, int], explored: np.ndarray,
+                 fixtures: List[dict]) -> ChunkSnapshot:
+        """Snapshot the modified chunks with a map window's state written into them
+
+        Nothing is written or read here: the resident chunks are copied
+        and the window (see GameMap.store_window) is applied to the
+        copies; stored chunks are read when the snapshot is.
+        """
+        shadow = ChunkedWorld(self.store, self.load_radius)
+        shadow.resident = {key: chunk.copy() for key, chunk in self.resident.items()}
+        width, height = explored.shape
+        shadow.write_explored(origin[0], origin[1], explored)
+        shadow.replace_entities_in_region(origin[0], origin[1], width, height, fixtures)
+        resident = {key: chunk for key, chunk in shadow.resident.items()
+                    if chunk.dirty or key in self.modified}
+        snapshot = ChunkSnapshot(self.store, resident, self.modified - set(resident))
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def restore(self, saved: List[Chunk], reset: List[Chunk]):
+        """Replace the stored progress with saved chunks
+
+        Resident chunks are dropped unsaved; reset holds the imported
+        state of the modified chunks that the save does not cover.
+        """
+        self.resident.clear()
+        for chunk in saved + reset:
+            self.save_chunk(chunk)
+        self.modified = {(chunk.cx, chunk.cy) for chunk in saved}
+
+    def overlapping(self, x: int, y: int, width: int, height: int) -> Iterator[Tuple[Chunk, tuple, tuple]]:
+        """Yield (chunk, chunk slices, region slices) for each chunk overlapping a region"""
+        cx0, cy0 = self.chunk_key(x, y)
+        cx1, cy1 = self.chunk_key(x + width - 1, y + height - 1)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                left, top = max(x, cx * CHUNK_SIZE), max(y, cy * CHUNK_SIZE)
+                right = min(x + width, (cx + 1) * CHUNK_SIZE)
+                bottom = min(y + height, (cy + 1) * CHUNK_SIZE)
+                chunk_slices = (slice(left - cx * CHUNK_SIZE, right - cx * CHUNK_SIZE),
+                                slice(top - cy * CHUNK_SIZE, bottom - cy * CHUNK_SIZE))
+                region_slices = (slice(left - x, right - x), slice(top - y, bottom - y))
+                yield self.get_chunk(cx, cy), chunk_slices, region_slices
+
+    def read_region(self, x: int, y: int, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """读取区域内的地块编号与探索状态"""
+        tile_ids = np.full((width, height), TILE_VOID, dtype=np.uint8)
+        explored = np.zeros((width, height), dtype=bool)
+        for chunk, chunk_slices, region_slices in self.overlapping(x, y, width, height):
+            tile_ids[region_slices] = chunk.tile_ids[chunk_slices]
+            explored[region_slices] = chunk.explored[chunk_slices]
+        return tile_ids, explored
+
+    def write_explored(self, x: int, y: int, explored: np.ndarray):
+        """写回区域的探索状态"""
+        width, height = explored.shape
+        for chunk, chunk_slices, region_slices in self.overlapping(x, y, width, height):
+            chunk.explored[chunk_slices] |= explored[region_slices]
+            chunk.dirty = True
+
+    def entities_in_region(self, x: int, y: int, width: int, height: int) -> List[dict]:
+        """获取区域内的实体记录"""
+        return [
+            record
+            for chunk, _, _ in self.overlapping(x, y, width, height)
+            for record in chunk.entities
+            if x <= record["x"] < x + width and y <= record["y"] < y + height
+        ]
+
+    def replace_entities_in_region(self, x: int, y: int, width: int, height: int, records: List[dict]):
+        """用新的实体记录替换区域内原有的记录"""
+        for chunk, _, _ in self.overlapping(x, y, width, height):
+            chunk.entities = [
+                record for record in chunk.entities
+                if not (x <= record["x"] < x + width and y <= record["y"] < y + height)
+            ]
+            chunk.dirty = True
+        for record in records:
+            self.add_entity(record)
+
+    def add_entity(self, record: dict):
+        """把实体记录放入其所在的区块"""
+        chunk = self.get_chunk(*self.chunk_key(record["x"], record["y"]))
+        chunk.entities.append(record)
+        chunk.dirty = True
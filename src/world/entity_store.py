@@ -0,0 +1,132 @@
+"""以整数句柄索引的实体存储：位置、标志与类型保存在NumPy数组中"""
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+import numpy as np
+from entities.game_object import ObjectType
+
+if TYPE_CHECKING:
+    from entities.physical_object import PhysicalObject
+    from entities.reference import Reference
+
+
+class EntityStore:
+    """Column store for map entities
+
+    Each Reference gets an integer handle; its position, blocks and
+    interactable flags and ObjectType tag live in parallel arrays so
+    systems can work on all entities at once. Handles of removed
+    entities are reused.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.blocks = np.zeros(capacity, dtype=bool)
+        self.interactable = np.zeros(capacity, dtype=bool)
+        self.type_tag = np.zeros(capacity, dtype=np.uint8)  # ObjectType.value, 0 = free slot
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.refs: List[Optional['Reference[PhysicalObject]']] = [None] * capacity
+        self.handles: Dict[str, int] = {}  # Reference.id -> handle
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def __iter__(self) -> Iterator['Reference[PhysicalObject]']:
+        for handle in np.flatnonzero(self.alive):
+            yield self.refs[handle]  # type: ignore[misc]
+
+    def grow(self):
+        """容量翻倍"""
+        old = len(self.refs)
+        for name in ("x", "y", "blocks", "interactable", "type_tag", "alive"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        self.refs.extend([None] * old)
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def add(self, reference: 'Reference[PhysicalObject]') -> int:
+        """加入实体并返回其句柄"""
+        if reference.id in self.handles:
+            raise ValueError(f"Reference with id {reference.id} is already on the map.")
+        if not self._free:
+            self.grow()
+        handle = self._free.pop()
+        self.refs[handle] = reference
+        self.handles[reference.id] = handle
+        self.alive[handle] = True
+        self.type_tag[handle] = reference.object_data.object_type.value
+        self.x[handle], self.y[handle] = reference.x, reference.y
+        self.sync_flags(reference)
+        return handle
+
+    def add_many(self, references: List['Reference[PhysicalObject]']) -> np.ndarray:
+        """Add many entities at once; the columns are filled with one array write each"""
+        ids = [reference.id for reference in references]
+        if len(set(ids)) != len(ids) or any(ref_id in self.handles for ref_id in ids):
+            raise ValueError("References added to the map must have unique ids.")
+        while len(self._free) < len(references):
+            self.grow()
+        count = len(references)
+        handles = self._free[len(self._free) - count:][::-1]
+        del self._free[len(self._free) - count:]
+        for handle, reference in zip(handles, references):
+            self.refs[handle] = reference
+        self.handles.update(zip(ids, handles))
+        index = np.array(handles, dtype=np.intp)
+        self.alive[index] = True
+        self.type_tag[index] = [reference.object_data.object_type.value for reference in references]
+        self.x[index] = [reference.x for reference in references]
+        self.y[index] = [reference.y for reference in references]
+        self.blocks[index] = [reference.blocks for reference in references]
+        self.interactable[index] = [reference.object_data.interactable for reference in references]
+        return index
+
+    def remove(self, reference: 'Reference[PhysicalObject]'):
+        """移除实体并回收句柄"""
+        handle = self.handles.pop(reference.id)
+        self.refs[handle] = None
+        self.alive[handle] = False
+        self.type_tag[handle] = 0
+        self._free.append(handle)
+
+    def clear(self):
+        capacity = len(self.refs)
+        self.alive.fill(False)
+        self.type_tag.fill(0)
+        self.refs = [None] * capacity
+        self.handles.clear()
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def handle_of(self, reference: 'Reference[PhysicalObject]') -> int:
+        return self.handles[reference.id]
+
+    def get(self, handle: int) -> Optional['Reference[PhysicalObject]']:
+        return self.refs[handle]
+
+    def set_position(self, reference: 'Reference[PhysicalObject]', x: int, y: int):
+        handle = self.handles[reference.id]
+        self.x[handle], self.y[handle] = x, y
+
+    def sync_flags(self, reference: 'Reference[PhysicalObject]'):
+        """实体的 blocks/interactable 变化后（如开门）同步到数组"""
+        handle = self.handles[reference.id]
+        self.blocks[handle] = reference.blocks
+        self.interactable[handle] = reference.object_data.interactable
+
+    def select(self, object_type: Optional[ObjectType] = None) -> np.ndarray:
+        """获取存活实体（可按类型过滤）的句柄数组"""
+        mask = self.alive if object_type is None else self.type_tag == object_type.value
+        return np.flatnonzero(mask)
+
+    def of_type(self, object_type: ObjectType) -> List['Reference[PhysicalObject]']:
+        """获取指定类型的所有实体"""
+        return [self.refs[handle] for handle in self.select(object_type)]  # type: ignore[misc]
+
+    def within_radius(self, x: int, y: int, radius: float,
+                      object_type: Optional[ObjectType] = None) -> List['Reference[PhysicalObject]']:
+        """获取与(x, y)直线距离不超过radius的实体，一次向量化计算"""
+        handles = self.select(object_type)
+        dx = self.x[handles] - x
+        dy = self.y[handles] - y
+        near = handles[dx * dx + dy * dy <= radius * radius]
+        return [self.refs[handle] for handle in near]  # type: ignore[misc]
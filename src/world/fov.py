@@ -0,0 +1,70 @@
+"""对称阴影投射视野算法（symmetric shadowcasting）"""
+from fractions import Fraction
+from typing import List, Tuple
+import numpy as np
+
+
+# 四个象限的坐标变换：(depth, col) -> (dx, dy)
+QUADRANTS = (
+    lambda depth, col: (col, -depth),  # north
+    lambda depth, col: (depth, col),   # east
+    lambda depth, col: (col, depth),   # south
+    lambda depth, col: (-depth, col),  # west
+)
+
+
+def round_ties_up(n: Fraction) -> int:
+    return int((n + Fraction(1, 2)) // 1)
+
+
+def round_ties_down(n: Fraction) -> int:
+    return -int((-n + Fraction(1, 2)) // 1)
+
+
+def compute_visible(blocks_sight: np.ndarray, origin_x: int, origin_y: int, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """计算从原点可见的所有格子
+
+    blocks_sight is indexed [x, y]; cells outside it count as opaque.
+    Returns the visible cells as (xs, ys) index arrays, suitable for
+    fancy-indexing into arrays of the same shape.
+    """
+    width, height = blocks_sight.shape
+    radius_sq = radius * radius
+    visible: List[Tuple[int, int]] = [(origin_x, origin_y)]
+
+    for transform in QUADRANTS:
+        def is_wall(depth, col, transform=transform):
+            dx, dy = transform(depth, col)
+            x, y = origin_x + dx, origin_y + dy
+            return not (0 <= x < width and 0 <= y < height) or bool(blocks_sight[x, y])
+
+        def reveal(depth, col, transform=transform):
+            dx, dy = transform(depth, col)
+            x, y = origin_x + dx, origin_y + dy
+            if 0 <= x < width and 0 <= y < height and dx * dx + dy * dy <= radius_sq:
+                visible.append((x, y))
+
+        # Rows still to scan: (depth, start_slope, end_slope)
+        rows = [(1, Fraction(-1), Fraction(1))]
+        while rows:
+            depth, start_slope, end_slope = rows.pop()
+            if depth > radius:
+                continue
+            prev_wall = None
+            min_col = round_ties_up(depth * start_slope)
+            max_col = round_ties_down(depth * end_slope)
+            for col in range(min_col, max_col + 1):
+                wall = is_wall(depth, col)
+                # Walls are always lit; floors only when visible symmetrically
+                if wall or (depth * start_slope <= col <= depth * end_slope):
+                    reveal(depth, col)
+                if prev_wall and not wall:
+                    start_slope = Fraction(2 * col - 1, 2 * depth)
+                if prev_wall is False and wall:
+                    rows.append((depth + 1, start_slope, Fraction(2 * col - 1, 2 * depth)))
+                prev_wall = wall
+            if prev_wall is False:
+                rows.append((depth + 1, start_slope, end_slope))
+
+    xs, ys = np.array(visible, dtype=np.intp).T
+    return xs, ys
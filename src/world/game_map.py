@@ -1,7 +1,12 @@
-from typing import List, Tuple, TYPE_CHECKING, Union, cast
+import heapq
+import itertools
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING, Union
 import numpy as np
 import pygame
-from config import COLOR, WALL, FLOOR, PLAYER, MAP_WIDTH, MAP_HEIGHT
+from config import PLAYER, MAP_WIDTH, MAP_HEIGHT
+from config.settings import FOV_RADIUS, FOV_CACHE_SIZE, MAP_SCROLL_MARGIN
 from data.object_manager import object_manager
 from entities.game_object import ObjectType
 from entities.reference import Reference
@@ -9,12 +14,24 @@ from entities.activator import Activator
 from entities.static import Static
 from entities.item import Item
 from entities.door import Door
+from entities.mobile import Mobile
+from ui.glyph_cache import glyph_cache
+from ui.text_renderer import dim_color
+from world.chunks import Chunk, ChunkedWorld, import_chunk
+from world.fov import compute_visible
+from world.entity_store import EntityStore
+from world.spatial_hash import SpatialHash
+from world.map_delta import (STATEFUL_TYPE_TAGS, MapSnapshot, WindowDelta, map_hash, apply_record_diff,
+                              baseline_window, check_record, decode_explored, decode_tiles, entity_record)
+from world.tiles import TILE_VOID, get_tile_types, parse_map_row
 
 if TYPE_CHECKING:
     from entities.physical_object import PhysicalObject
     from entities.npc import NPC
     from entities.player import Player
 
+logger = logging.getLogger(__name__)
+
 
 class GameMap:
     def __init__(self, map_strings: List[str]):
@@ -22,53 +39,277 @@ class GameMap:
         self.fov = np.zeros((self.width, self.height), dtype=bool)
         self.explored = np.zeros((self.width, self.height), dtype=bool)
 
-        # Store references here
-        self.references: List[Reference['PhysicalObject']] = []
+        # 逐格图层，与 fov 一样按 [x, y] 索引
+        self.tile_ids = np.full((self.width, self.height), TILE_VOID, dtype=np.uint8)
+        self.blocks_movement = np.zeros((self.width, self.height), dtype=bool)
+        self.blocks_sight = np.zeros((self.width, self.height), dtype=bool)
+        self.interactable = np.zeros((self.width, self.height), dtype=bool)
+
+        # Bumped whenever a blocking layer changes; part of the FOV and flow field cache keys
+        self.revision = 0
+        self._fov_cache: 'OrderedDict[Tuple[int, int, int, int], Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+        self._fov_key = None
+        self._flow_field = np.full((self.width, self.height), -1, dtype=np.int32)
+        self._flow_key = None
+
+        # Retained map surface; only cells flagged in `dirty` are redrawn
+        self.dirty = np.ones((self.width, self.height), dtype=bool)
+        self._map_surface: 'pygame.Surface | None' = None
+        self._render_key = None
+
+        # Entity references (doors, items, actors...), tiles excluded
+        self.entities = EntityStore()  # 按整数句柄存储，供整体数组运算
+        self.entity_index = SpatialHash()  # 按位置索引，供单格查询
+        self._entity_ids = itertools.count()  # 固定实体的id序号；id与位置无关
         self.player_start = (3, 3)  # default starting position
 
+        # Shared tile definitions indexed by tile id; cells only store the id
+        self.tile_types = get_tile_types()
+        self.tile_blocks = np.array(
+            [tile is not None and tile.blocks for tile in self.tile_types], dtype=bool)
+
+        # For maps larger than the screen, this map is a window onto a
+        # chunked world; origin is the world position of local (0, 0)
+        self.chunked_world: ChunkedWorld | None = None
+        self.origin = (0, 0)
+
         # Load the map from the provided strings
         self.load_from_strings(map_strings)
 
+    @property
+    def references(self) -> List[Reference['PhysicalObject']]:
+        """地图上的所有实体Reference（按句柄顺序）"""
+        return list(self.entities)
+
+    def new_entity_id(self, object_data: 'PhysicalObject') -> str:
+        """A map-unique id; several entities may share a cell, so it does not encode the position"""
+        return f"{object_data.id}#{next(self._entity_ids)}"
+
     def create_reference(self, object_data: 'Union[PhysicalObject, Item, Activator, Static, Player, NPC]', position: Tuple[int, int]):
         """创建Reference并添加到地图"""
-        reference = Reference(object_data.id, *position, object_data=object_data)
-        self.references.append(reference)
+        reference = Reference(self.new_entity_id(object_data), *position, object_data=object_data)
+        self.add_reference(reference)
         return reference
 
     def load_from_strings(self, map_strings: list):
         """从字符串列表加载地图"""
         # Convert text map to grid
-        for y, row in enumerate(map_strings):
-            for x, char in enumerate(row):
-                if self.is_within_bounds(x, y):
-                    # Set tile type
-                    wall = Static("wall", WALL, COLOR.INK, blocks=True)
-                    floor = Static(
-                        "floor", FLOOR, COLOR.LIGHT_TAUPE, blocks=False)
-                    if char == WALL:
+        for y, row in enumerate(map_strings[:self.height]):
+            tile_ids, special = parse_map_row(row[:self.width])
+            self.tile_ids[:len(tile_ids), y] = tile_ids
+
+            # Place entities
+            for x, char in special:
+                if char == PLAYER:
+                    # This is the player starting position
+                    self.player_start = (x, y)
+                elif char == '+':
+                    door = object_manager.get_object("door")
+                    if isinstance(door, Door):
                         self.create_reference(
-                            object_data=wall, position=(x, y))
-                    elif char == FLOOR:
-                        self.create_reference(
-                            object_data=floor, position=(x, y))
-                    else:
-                        self.create_reference(
-                            object_data=floor, position=(x, y))
-
-                    # Place entities
-                    if char == PLAYER:
-                        # This is the player starting position
-                        self.player_start = (x, y)
-                    elif char == '+':
-                        door = object_manager.get_object("door")
-                        if isinstance(door, Door):
-                            self.create_reference(
-                                object_data=door, position=(x, y))
-
-    def get_reference_at(self, x: int, y: int):
-        """获取指定位置的参照物"""
-        for ref in self.references:
-            if ref.x == x and ref.y == y:
+                            object_data=door, position=(x, y))
+
+        self.apply_tile_layers()
+
+    def apply_tile_layers(self):
+        """Blocking tiles (walls) block both movement and sight; entities are layered on top"""
+        blocking = self.tile_blocks[self.tile_ids]
+        self.blocks_movement |= blocking
+        self.blocks_sight |= blocking
+        self.revision += 1
+
+    def apply_entity_layers(self):
+        """Layer the fixtures over the tile layers in one pass over the entity columns
+
+        Same result as refresh_cell() on every fixture cell, without
+        querying the spatial index cell by cell.
+        """
+        store = self.entities
+        handles = np.flatnonzero(store.alive & (store.type_tag != ObjectType.NPC.value))
+        xs, ys = store.x[handles], store.y[handles]
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        handles, xs, ys = handles[inside], xs[inside], ys[inside]
+        blocks = store.blocks[handles]
+        self.blocks_movement[xs[blocks], ys[blocks]] = True
+        doors = blocks & (store.type_tag[handles] == ObjectType.DOOR.value)
+        self.blocks_sight[xs[doors], ys[doors]] = True
+        interactable = store.interactable[handles]
+        self.interactable[xs[interactable], ys[interactable]] = True
+        self.revision += 1
+
+    @classmethod
+    def from_chunked_world(cls, world: ChunkedWorld) -> 'GameMap':
+        """创建一个以玩家起点为中心、映射到分块世界的地图窗口"""
+        game_map = cls([])
+        game_map.chunked_world = world
+        start_x, start_y = world.player_start
+        origin_x, origin_y = start_x - game_map.width // 2, start_y - game_map.height // 2
+        game_map.load_window(origin_x, origin_y)
+        game_map.player_start = (start_x - origin_x, start_y - origin_y)
+        return game_map
+
+    def load_window(self, origin_x: int, origin_y: int):
+        """从分块世界加载窗口内的地块与实体；已有的角色保留在地图上"""
+        world = self.chunked_world
+        assert world is not None
+        world.update_focus(origin_x + self.width // 2, origin_y + self.height // 2)
+        tile_ids, explored = world.read_region(origin_x, origin_y, self.width, self.height)
+        actors = [ref for ref in self.references if not self.is_fixture(ref)]
+
+        # Start from empty layers
+        self.origin = (origin_x, origin_y)
+        self.tile_ids[:] = tile_ids
+        self.explored[:] = explored
+        self.fov.fill(False)
+        self.blocks_movement.fill(False)
+        self.blocks_sight.fill(False)
+        self.interactable.fill(False)
+        self.dirty.fill(True)
+        self.entities.clear()
+        self.entity_index.clear()
+        self._fov_cache.clear()
+        self._fov_key = None
+        self.apply_tile_layers()
+
+        for record in world.entities_in_region(origin_x, origin_y, self.width, self.height):
+            object_data = object_manager.get_object(record["object_data"])
+            if object_data is None:
+                logger.warning("Unknown object in chunk: %s", record["object_data"])
+                continue
+            x, y = record["x"] - origin_x, record["y"] - origin_y
+            if record.get("actor"):
+                reference = Reference(record["id"], x, y, object_data=object_data)
+                Mobile(x, y, reference)
+                self.add_reference(reference)
+            else:
+                self.create_reference(object_data=object_data, position=(x, y))
+        for ref in actors:
+            self.add_reference(ref)
+
+    def store_window(self):
+        """把窗口内的探索状态与固定实体写回分块世界"""
+        world = self.chunked_world
+        assert world is not None
+        origin_x, origin_y = self.origin
+        world.write_explored(origin_x, origin_y, self.explored)
+        world.replace_entities_in_region(origin_x, origin_y, self.width, self.height,
+                                         self.fixture_records())
+
+    def fixture_records(self) -> List[dict]:
+        """窗口内固定实体的区块记录（世界坐标）"""
+        origin_x, origin_y = self.origin
+        return [
+            {"object_data": ref.object_data.id, "x": ref.x + origin_x, "y": ref.y + origin_y}
+            for ref in self.references if self.is_fixture(ref)
+        ]
+
+    def needs_recenter(self, x: int, y: int) -> bool:
+        """玩家是否已接近窗口边缘"""
+        return self.chunked_world is not None and not (
+            MAP_SCROLL_MARGIN <= x < self.width - MAP_SCROLL_MARGIN
+            and MAP_SCROLL_MARGIN <= y < self.height - MAP_SCROLL_MARGIN
+        )
+
+    def recenter(self, x: int, y: int) -> Tuple[int, int]:
+        """Slide the window so (x, y) becomes its centre; returns the local shift applied"""
+        shift_x, shift_y = x - self.width // 2, y - self.height // 2
+        self.store_window()
+        origin_x, origin_y = self.origin[0] + shift_x, self.origin[1] + shift_y
+
+        # Actors move with the window; those left behind go back to their chunk
+        assert self.chunked_world is not None
+        for ref in [ref for ref in self.references if not self.is_fixture(ref)]:
+            new_x, new_y = ref.x - shift_x, ref.y - shift_y
+            if self.is_within_bounds(new_x, new_y) or ref.id == "player":
+                # The indexes are rebuilt by load_window, so positions can be set directly
+                ref.x, ref.y = new_x, new_y
+                if ref.mobile is not None:
+                    ref.mobile.x, ref.mobile.y = new_x, new_y
+            else:
+                self.entities.remove(ref)
+                self.entity_index.remove(ref)
+                self.chunked_world.add_entity({
+                    "id": ref.id,
+                    "object_data": ref.object_data.id,
+                    "x": ref.x + self.origin[0],
+                    "y": ref.y + self.origin[1],
+                    "actor": True,
+                })
+
+        self.load_window(origin_x, origin_y)
+        return shift_x, shift_y
+
+    def add_reference(self, reference: Reference['PhysicalObject']):
+        """添加实体Reference并更新所在格的图层"""
+        self.entities.add(reference)
+        self.entity_index.insert(reference)
+        self.mark_dirty(reference.x, reference.y)
+        if self.is_fixture(reference):
+            self.refresh_cell(reference.x, reference.y)
+
+    def remove_reference(self, reference: Reference['PhysicalObject']):
+        """移除实体Reference（如被拾取的物品）并更新所在格的图层"""
+        self.entities.remove(reference)
+        self.entity_index.remove(reference)
+        self.mark_dirty(reference.x, reference.y)
+        if self.is_fixture(reference):
+            self.refresh_cell(reference.x, reference.y)
+
+    def move_reference(self, reference: Reference['PhysicalObject'], x: int, y: int):
+        """移动实体Reference，并同步其Mobile的位置"""
+        self.mark_dirty(reference.x, reference.y)
+        self.entity_index.move(reference, x, y)
+        self.entities.set_position(reference, x, y)
+        reference.x, reference.y = x, y
+        if reference.mobile is not None:
+            reference.mobile.x, reference.mobile.y = x, y
+        self.mark_dirty(x, y)
+
+    def is_fixture(self, reference: Reference['PhysicalObject']) -> bool:
+        """Fixtures (doors, items, activators) stay put and live in the layers; actors move around"""
+        return reference.object_data.object_type != ObjectType.NPC
+
+    def refresh_cell(self, x: int, y: int):
+        """根据地块和其上的固定实体重新计算该格的图层"""
+        if not self.is_within_bounds(x, y):
+            return
+        blocks = bool(self.tile_blocks[self.tile_ids[x, y]])
+        blocks_sight = blocks
+        interactable = False
+        for ref in self.entity_index.query_point(x, y):
+            if self.is_fixture(ref):
+                blocks = blocks or ref.blocks
+                if ref.object_data.object_type == ObjectType.DOOR:
+                    blocks_sight = blocks_sight or ref.blocks
+                interactable = interactable or ref.object_data.interactable
+        if self.blocks_movement[x, y] != blocks or self.blocks_sight[x, y] != blocks_sight:
+            self.blocks_movement[x, y] = blocks
+            self.blocks_sight[x, y] = blocks_sight
+            self.revision += 1
+        self.dirty[x, y] = True
+        self.interactable[x, y] = interactable
+
+    def refresh_doors(self):
+        """门的状态变化后更新所有门所在格的图层"""
+        for ref in self.entities.of_type(ObjectType.DOOR):
+            self.entities.sync_flags(ref)
+            self.refresh_cell(ref.x, ref.y)
+
+    def get_tile_at(self, x: int, y: int) -> Optional['Static']:
+        """获取指定位置的地块定义"""
+        if not self.is_within_bounds(x, y):
+            return None
+        return self.tile_types[self.tile_ids[x, y]]
+
+    def get_entities_at(self, x: int, y: int, object_type: Optional[ObjectType] = None,
+                        blocks: Optional[bool] = None) -> List[Reference['PhysicalObject']]:
+        """获取指定位置的实体"""
+        return self.entity_index.query_point(x, y, object_type, blocks)
+
+    def get_interactable_at(self, x: int, y: int):
+        """获取指定位置的可交互实体"""
+        for ref in self.entity_index.query_point(x, y):
+            if ref.object_data.interactable:
                 return ref
         return None
 
@@ -78,39 +319,73 @@ class GameMap:
 
     def is_blocked(self, x, y):
         """Check if a tile is blocked"""
-        # Check tile blocking
-        tile = self.get_reference_at(x, y)
-        if tile and tile.object_data.blocks:
+        if not self.is_within_bounds(x, y):
             return True
-        return False
+        return bool(self.blocks_movement[x, y])
 
-    def is_blocked_by_entity(self, x, y, entities):
+    def is_blocked_by_entity(self, x, y):
         """Check if a position is blocked by an entity"""
-        for entity in entities:
-            if entity.blocks and entity.x == x and entity.y == y:
-                return True
-        return False
-
-    def compute_fov(self, player_x, player_y, radius=3):
-        # Reset FOV
+        return bool(self.entity_index.query_point(x, y, blocks=True))
+
+    def compute_fov(self, player_x, player_y, radius=FOV_RADIUS):
+        """Compute line-of-sight FOV, reusing cached results for known positions"""
+        key = (player_x, player_y, radius, self.revision)
+        if key == self._fov_key:
+            return
+
+        visible = self._fov_cache.get(key)
+        if visible is None:
+            # Entries from older revisions can never hit again
+            if self._fov_cache and next(iter(self._fov_cache))[3] != self.revision:
+                self._fov_cache.clear()
+            visible = compute_visible(self.blocks_sight, player_x, player_y, radius)
+            self._fov_cache[key] = visible
+            if len(self._fov_cache) > FOV_CACHE_SIZE:
+                self._fov_cache.popitem(last=False)
+        else:
+            self._fov_cache.move_to_end(key)
+
+        previous = self.fov.copy()
         self.fov.fill(False)
-
-        # Simple circular FOV
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                x = player_x + dx
-                y = player_y + dy
-                if self.is_within_bounds(x, y):
-                    if dx * dx + dy * dy <= radius * radius:
-                        self.fov[x, y] = True
-                        self.explored[x, y] = True
-
-    def find_path(self, start_x, start_y, target_x, target_y, entities):
-        """A* pathfinding algorithm with obstacle avoidance"""
+        self.fov[visible] = True
+        self.explored[visible] = True
+        self.dirty |= previous ^ self.fov
+        self._fov_key = key
+
+    def walkable_mask(self, entities=None) -> np.ndarray:
+        """合并静态图层与阻挡实体，生成可通行掩码"""
+        walkable = ~self.blocks_movement
+        if entities is None:
+            store = self.entities
+            blocking = store.alive & store.blocks
+            xs, ys = store.x[blocking], store.y[blocking]
+            inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+            walkable[xs[inside], ys[inside]] = False
+            return walkable
+        for entity in entities:
+            if entity.blocks and self.is_within_bounds(entity.x, entity.y):
+                walkable[entity.x, entity.y] = False
+        return walkable
+
+    def find_path(self, start_x, start_y, target_x, target_y, entities=None) -> List[Tuple[int, int]]:
+        """A* pathfinding algorithm with obstacle avoidance
+
+        Returns the steps from start (exclusive) to target (inclusive),
+        or an empty list if the target cannot be reached. Blocking entities
+        come from the entity index unless an explicit list is given.
+        """
+        if not self.is_within_bounds(start_x, start_y) or not self.is_within_bounds(target_x, target_y):
+            return []
+
+        # Blocking entities are baked into the mask once per search;
+        # the start and target cells are usually occupied by the actors themselves
+        walkable = self.walkable_mask(entities)
+        walkable[start_x, start_y] = True
+        walkable[target_x, target_y] = True
 
         # Simple heuristic: Manhattan distance
-        def heuristic(x1, y1, x2, y2):
-            return abs(x1 - x2) + abs(y1 - y2)
+        def heuristic(x, y):
+            return abs(x - target_x) + abs(y - target_y)
 
         # Possible moves (4 directions)
         directions = [
@@ -120,146 +395,297 @@ class GameMap:
             (1, 0),  # Cardinal directions
         ]
 
-        # Initialize open and closed sets
-        open_set = []
-        closed_set = set()
-
-        # Add start node
-        start_node = (
-            start_x,
-            start_y,
-            0,
-            heuristic(start_x, start_y, target_x, target_y),
-            None,
-        )
-        open_set.append(start_node)
+        unvisited = np.iinfo(np.int32).max
+        g_score = np.full((self.width, self.height), unvisited, dtype=np.int32)
+        came_from = {}
+
+        # Heap entries are (f_score, h_score, x, y); ties prefer nodes nearer the target
+        g_score[start_x, start_y] = 0
+        start_h = heuristic(start_x, start_y)
+        open_heap = [(start_h, start_h, start_x, start_y)]
 
-        while open_set:
-            # Find node with lowest f_score
-            current = min(open_set, key=lambda node: node[3])
-            open_set.remove(current)
-            closed_set.add((current[0], current[1]))
+        while open_heap:
+            f, h, x, y = heapq.heappop(open_heap)
+            g = f - h
 
             # Check if we reached target
-            if current[0] == target_x and current[1] == target_y:
-                # Reconstruct path
+            if x == target_x and y == target_y:
+                # Reconstruct path by following parent pointers
                 path = []
-                while current[4]:  # Follow parent pointers
-                    path.append((current[0], current[1]))
-                    current = current[4]
-                if path:
-                    return path[-1]  # Return next step in path
-                return (start_x, start_y)  # Stay in place if no path
+                while (x, y) in came_from:
+                    path.append((x, y))
+                    x, y = came_from[(x, y)]
+                path.reverse()
+                return path
+
+            # Skip stale heap entries superseded by a better path
+            if g > g_score[x, y]:
+                continue
 
             # Check neighbors
+            new_g = g + 1
             for dx, dy in directions:
-                nx, ny = current[0] + dx, current[1] + dy
-
-                # Skip if out of bounds or blocked
-                if not self.is_within_bounds(nx, ny):
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < self.width and 0 <= ny < self.height):
                     continue
-                if self.is_blocked(nx, ny):
+                if not walkable[nx, ny]:
                     continue
-
-                # Skip if occupied by another blocking entity
-                occupied = False
-                for entity in entities:
-                    if (
-                        entity.blocks
-                        and entity != self
-                        and entity.x == nx
-                        and entity.y == ny
-                    ):
-                        occupied = True
-                        break
-                if occupied:
-                    continue
-
-                # Skip if already in closed set
-                if (nx, ny) in closed_set:
-                    continue
-
-                # Calculate new g_score (cost from start)
-                new_g = current[2] + 1
-
-                # Check if this node is already in open set
-                in_open = False
-                for node in open_set:
-                    if node[0] == nx and node[1] == ny:
-                        in_open = True
-                        if new_g < node[2]:
-                            # Update with better path
-                            node = (
-                                nx,
-                                ny,
-                                new_g,
-                                new_g + heuristic(nx, ny, target_x, target_y),
-                                current,
-                            )
-                        break
-
-                if not in_open:
-                    # Add new node to open set
-                    new_node = (
-                        nx,
-                        ny,
-                        new_g,
-                        new_g + heuristic(nx, ny, target_x, target_y),
-                        current,
-                    )
-                    open_set.append(new_node)
+                if new_g < g_score[nx, ny]:
+                    g_score[nx, ny] = new_g
+                    came_from[(nx, ny)] = (x, y)
+                    new_h = heuristic(nx, ny)
+                    heapq.heappush(open_heap, (new_g + new_h, new_h, nx, ny))
 
         # No path found
-        return (start_x, start_y)
+        return []
+
+    def flow_field(self, target_x: int, target_y: int) -> np.ndarray:
+        """Breadth-first distance map to the target over the static layers
+
+        Cells hold the step count to the target, or -1 if unreachable. The
+        field is shared by all actors and only rebuilt when the target moves
+        or the map revision changes.
+        """
+        key = (target_x, target_y, self.revision)
+        if key == self._flow_key:
+            return self._flow_field
+
+        # Flat index = x * height + y, matching the [x, y] layout
+        height = self.height
+        walkable = (~self.blocks_movement).ravel().tolist()
+        distance = [-1] * len(walkable)
+        target = target_x * height + target_y
+        distance[target] = 0
+        queue = deque([target])
+        while queue:
+            index = queue.popleft()
+            next_distance = distance[index] + 1
+            y = index % height
+            for neighbour in (
+                index - height,
+                index + height,
+                index - 1 if y > 0 else -1,
+                index + 1 if y < height - 1 else -1,
+            ):
+                if 0 <= neighbour < len(walkable) and walkable[neighbour] and distance[neighbour] < 0:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+
+        self._flow_field = np.array(distance, dtype=np.int32).reshape(self.width, self.height)
+        self._flow_key = key
+        return self._flow_field
+
+    def flow_step(self, x: int, y: int, target_x: int, target_y: int) -> Optional[Tuple[int, int]]:
+        """沿流场向目标下降一步；无法靠近时返回None"""
+        field = self.flow_field(target_x, target_y)
+        current = field[x, y] if field[x, y] >= 0 else np.iinfo(np.int32).max
+        best, best_key = None, None
+        for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+            nx, ny = x + dx, y + dy
+            if not self.is_within_bounds(nx, ny) or not 0 <= field[nx, ny] < current:
+                continue
+            # Ties go to the straighter line so chasers don't zigzag
+            key = (field[nx, ny], (nx - target_x) ** 2 + (ny - target_y) ** 2)
+            if best_key is None or key < best_key:
+                best, best_key = (nx, ny), key
+        return best
+
+    def mark_dirty(self, x: int, y: int):
+        """标记需要重绘的格子"""
+        if self.is_within_bounds(x, y):
+            self.dirty[x, y] = True
 
     def render(self, surface: pygame.Surface, char_size: Tuple[int, int], font: pygame.font.Font):
-        """Render the game map and entities"""
+        """Render the game map and entities, redrawing only dirty tiles"""
         map_x, map_y = 0, char_size[1]
-        map_bg = pygame.Surface(
-            (MAP_WIDTH * char_size[0], MAP_HEIGHT * char_size[1]),
-            pygame.SRCALPHA,
-        )
 
-        # Draw references (floor, walls, items, etc.)
-        for ref in self.references:
-            char = getattr(ref.object_data, "char", None)
-            color = getattr(ref.object_data, "color", None)
+        # Resizes and font changes invalidate the whole retained surface
+        render_key = (char_size, font)
+        if self._map_surface is None or render_key != self._render_key:
+            self._map_surface = pygame.Surface(
+                (MAP_WIDTH * char_size[0], MAP_HEIGHT * char_size[1]),
+                pygame.SRCALPHA,
+            )
+            self._render_key = render_key
+            self.dirty.fill(True)
+
+        if self.dirty.any():
+            for x, y in zip(*np.nonzero(self.dirty)):
+                x, y = int(x), int(y)
+                self.render_tile(x, y, self.entity_index.query_point(x, y), char_size, font)
+            self.dirty.fill(False)
+
+        surface.blit(self._map_surface, (map_x, map_y))
+
+    def render_tile(self, x: int, y: int, entities: List[Reference['PhysicalObject']],
+                    char_size: Tuple[int, int], font: pygame.font.Font):
+        """Redraw one cell of the retained map surface"""
+        assert self._map_surface is not None
+        position = (x * char_size[0], y * char_size[1])
+        self._map_surface.fill((0, 0, 0, 0), pygame.Rect(position, char_size))
+        if not self.fov[x, y] and not self.explored[x, y]:
+            return
+
+        # Draw the tile first, then whatever stands on it
+        tile = self.tile_types[self.tile_ids[x, y]]
+        glyphs = [(tile.char, tile.color)] if tile is not None else []
+        glyphs += [(ref.char, getattr(ref.object_data, "color", None)) for ref in entities]
+        for char, color in glyphs:
             if not char or not color:
                 continue
-            if self.fov[ref.x, ref.y]:
-                text_surface = font.render(
-                    char, True, color)
-                map_bg.blit(
-                    text_surface,
-                    (ref.x * char_size[0], ref.y * char_size[1]),
-                )
-            elif self.explored[ref.x, ref.y]:
-                dimmed_color = (
-                    min(color[0] + (255 - color[0]) // 2, 255),
-                    min(color[1] + (255 - color[1]) // 2, 255),
-                    min(color[2] + (255 - color[2]) // 2, 255),
-                )
-                text_surface = font.render(
-                    char, True, dimmed_color)
-                map_bg.blit(
-                    text_surface,
-                    (ref.x * char_size[0], ref.y * char_size[1]),
-                )
-
-        surface.blit(map_bg, (map_x, map_y))
+            if not self.fov[x, y]:
+                color = dim_color(color)
+            text_surface = glyph_cache.render(font, char, color, antialias=True)
+            self._map_surface.blit(text_surface, position)
 
     def reset_door(self):
-        for ref in self.references:
-            if ref.object_data.object_type == ObjectType.DOOR:
-                ref.object_data = cast('Door', ref.object_data)
-                ref.object_data.blocks = True
-                ref.object_data.char = ref.object_data.close_char
-
-    def to_dict(self) -> dict:
-        print("Serializing GameMap")
-        return {
-            "explored": self.explored.tolist(),
-            "references": [
-                ref.to_dict() for ref in self.references
-            ]
-        }
+        for ref in self.entities.of_type(ObjectType.DOOR):
+            ref.is_open = False
+        self.refresh_doors()
+
+    def set_layers(self, tile_ids: np.ndarray, explored: np.ndarray):
+        """替换地块与探索图层，并重建阻挡图层"""
+        if tile_ids.shape != self.tile_ids.shape or explored.shape != self.explored.shape:
+            raise ValueError(
+                f"Saved map layers {tile_ids.shape} do not match the map size {self.tile_ids.shape}.")
+        self.tile_ids[:] = tile_ids
+        self.explored[:] = explored
+        self.fov.fill(False)
+        self.blocks_movement.fill(False)
+        self.blocks_sight.fill(False)
+        self.interactable.fill(False)
+        self.dirty.fill(True)
+        self._fov_cache.clear()
+        self._fov_key = None
+        self.apply_tile_layers()
+        self.apply_entity_layers()
+
+    def snapshot(self, map_strings: List[str]) -> MapSnapshot:
+        """Copy what a save needs from the window; the delta is computed later from the copy
+
+        Positions are copied from the entity columns, and full records
+        are only built now for doors and actors, whose state (open, hp)
+        lives outside them. Entity ids and object ids do not change, so
+        the save worker reads them from the references.
+
+        On a chunked world every chunk modified since the import is
+        snapshot too, so progress outside the window is saved; nothing is
+        written to or read from the chunk store here.
+        """
+        chunks = None
+        if self.chunked_world is not None:
+            chunks = self.chunked_world.snapshot(self.origin, self.explored, self.fixture_records())
+        store = self.entities
+        handles = np.flatnonzero(store.alive)
+        references = [store.refs[handle] for handle in handles]
+        stateful = handles[np.isin(store.type_tag[handles], STATEFUL_TYPE_TAGS)]
+        return MapSnapshot(
+            map_strings=map_strings,
+            origin=self.origin,
+            size=(self.width, self.height),
+            tile_ids=self.tile_ids.copy(),
+            explored=self.explored.copy(),
+            references=references,  # type: ignore[arg-type]
+            xs=store.x[handles],
+            ys=store.y[handles],
+            locked={ref.id for ref in references if ref.locked},  # type: ignore[union-attr]
+            records={ref.id: entity_record(ref)  # type: ignore[union-attr]
+                     for ref in map(store.refs.__getitem__, stateful)},
+            chunks=chunks,
+        )
+
+    def decode_delta(self, data: dict, map_strings: List[str]) -> WindowDelta:
+        """Check and decode a delta from MapSnapshot.to_delta() without touching the map
+
+        Raises ValueError (or KeyError/TypeError for malformed data) so a
+        bad save is rejected before anything is replaced.
+        """
+        if data["baseline"] != map_hash(map_strings):
+            raise ValueError("The save was made against a different map.")
+        origin = (int(data["origin"][0]), int(data["origin"][1]))
+        base_tiles, base_records = baseline_window(map_strings, origin, (self.width, self.height))
+        tile_ids = decode_tiles(data["tiles"], base_tiles, len(self.tile_types))
+        explored = decode_explored(data["explored"], self.explored.shape)
+
+        records = apply_record_diff(base_records, data["removed"], data["entities"])
+        chunks, reset_chunks = self.decode_chunks(data.get("chunks"), map_strings)
+        return WindowDelta(origin, tile_ids, explored, records, chunks, reset_chunks)
+
+    def decode_chunks(self, data: Optional[List[dict]], map_strings: List[str]
+                      ) -> Tuple[List[Chunk], List[Chunk]]:
+        """Rebuild the saved chunks on their imported state, and list the modified chunks to reset"""
+        if self.chunked_world is None:
+            if data:
+                raise ValueError("The save has chunk data but the map is not chunked.")
+            return [], []
+        chunks = []
+        for entry in data or []:
+            chunk = import_chunk(map_strings, int(entry["key"][0]), int(entry["key"][1]))
+            chunk.explored = decode_explored(entry["explored"], chunk.explored.shape)
+            if "entities" in entry:
+                for record in entry["entities"]:
+                    check_record(record)
+                    if self.chunked_world.chunk_key(record["x"], record["y"]) != (chunk.cx, chunk.cy):
+                        raise ValueError(f"Entity record outside its chunk: {record}")
+                chunk.entities = list(entry["entities"])
+            chunks.append(chunk)
+        saved = {(chunk.cx, chunk.cy) for chunk in chunks}
+        reset_chunks = [import_chunk(map_strings, *key)
+                        for key in sorted(self.chunked_world.modified - saved)]
+        return chunks, reset_chunks
+
+    def apply_delta(self, delta: WindowDelta):
+        """Replace the window (and the chunk store) with a delta decoded by decode_delta()"""
+        if self.chunked_world is not None:
+            self.chunked_world.restore(delta.chunks, delta.reset_chunks)
+        self.origin = delta.origin
+        self.entities.clear()
+        self.entity_index.clear()
+        self.add_records(delta.records)
+        if self.chunked_world is not None:
+            self.chunked_world.update_focus(self.origin[0] + self.width // 2,
+                                            self.origin[1] + self.height // 2)
+        self.set_layers(delta.tile_ids, delta.explored)
+        self.refresh_doors()
+
+    def add_record(self, record: dict) -> Optional[Reference['PhysicalObject']]:
+        """Create a Reference (and Mobile for actors) from an entity record and add it"""
+        reference = self.reference_from_record(record, object_manager.get_object(record["object_data"]))
+        if reference is not None:
+            self.add_reference(reference)
+        return reference
+
+    def add_records(self, records: Iterable[dict]) -> List[Reference['PhysicalObject']]:
+        """Bulk add_record for loading
+
+        Each object is looked up once per kind, and the references are
+        added to the entity store and spatial index together. The layers
+        are not refreshed; follow with set_layers() or apply_entity_layers().
+        """
+        objects: Dict[str, Optional['PhysicalObject']] = {}
+        references = []
+        for record in records:
+            object_id = record["object_data"]
+            if object_id not in objects:
+                objects[object_id] = object_manager.get_object(object_id)
+            reference = self.reference_from_record(record, objects[object_id])
+            if reference is not None:
+                references.append(reference)
+        self.entities.add_many(references)
+        self.entity_index.insert_many(references)
+        return references
+
+    def reference_from_record(self, record: dict, object_data: Optional['PhysicalObject']
+                              ) -> Optional[Reference['PhysicalObject']]:
+        """由实体记录创建Reference（角色附带Mobile），不加入地图"""
+        if object_data is None:
+            logger.warning("Unknown object in save: %s", record["object_data"])
+            return None
+        entity_id = record["id"] if record.get("actor") else self.new_entity_id(object_data)
+        reference = Reference(entity_id, record["x"], record["y"], object_data=object_data)
+        reference.locked = record.get("locked", False)
+        reference.is_open = record.get("open", False)
+        if record.get("actor"):
+            mobile = Mobile(reference.x, reference.y, reference)
+            mobile.hp = record.get("hp", mobile.hp)
+        return reference
@@ -0,0 +1,246 @@
+"""增量存档：相对于原始地图（按内容哈希识别）的差异"""
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+import numpy as np
+from core.array_codec import encode_array, decode_array, encode_bits, decode_bits
+from entities.game_object import ObjectType
+from world.chunks import Chunk, ChunkSnapshot, import_chunk
+from world.tiles import TILE_VOID, FIXTURE_CHARS, parse_map_row
+
+if TYPE_CHECKING:
+    from entities.physical_object import PhysicalObject
+    from entities.reference import Reference
+
+# Types whose entity_record() has state kept outside the entity columns (open, hp)
+STATEFUL_TYPE_TAGS = [ObjectType.DOOR.value, ObjectType.NPC.value]
+
+# Fields every saved entity record must have; only actors also keep their id
+RECORD_KEYS = ("object_data", "x", "y")
+
+
+@dataclass
+class MapSnapshot:
+    """A copy of a map window taken for saving; to_delta() may run on another thread
+
+    xs/ys are the positions of references; records holds the full
+    records of doors and actors, taken with the snapshot. On a chunked
+    world, chunks holds the chunks modified since the import.
+    """
+    map_strings: List[str]
+    origin: Tuple[int, int]
+    size: Tuple[int, int]
+    tile_ids: np.ndarray
+    explored: np.ndarray
+    references: List['Reference[PhysicalObject]']
+    xs: np.ndarray
+    ys: np.ndarray
+    locked: Set[str]
+    records: Dict[str, dict]
+    chunks: Optional[ChunkSnapshot] = None
+
+    def entity_records(self) -> List[dict]:
+        """entity_record() of every map entity as of the snapshot, the player excluded"""
+        records = []
+        for reference, x, y in zip(self.references, self.xs.tolist(), self.ys.tolist()):
+            if reference.id == "player":  # saved with the game (mobile_player)
+                continue
+            record = self.records.get(reference.id)
+            if record is None:
+                record = {"object_data": reference.object_data.id, "x": x, "y": y}
+                if reference.id in self.locked:
+                    record["locked"] = True
+            records.append(record)
+        return records
+
+    def to_delta(self) -> dict:
+        """Differences from the pristine map built from map_strings
+
+        Records changed tiles, the explored cells, baseline entity records
+        that are gone, and entity records that are not in the baseline
+        (moved, doors opened...). The size depends on what the player
+        changed, not on the map size.
+        """
+        base_tiles, base_records = baseline_window(self.map_strings, self.origin, self.size)
+        removed, added = diff_records(base_records, self.entity_records())
+        return {
+            "baseline": map_hash(self.map_strings),
+            "origin": list(self.origin),
+            "tiles": encode_tiles(self.tile_ids, base_tiles),
+            "explored": encode_explored(self.explored),
+            "removed": removed,
+            "entities": added,
+            **({"chunks": [self.chunk_delta(chunk) for chunk in self.chunks.read()]}
+               if self.chunks is not None else {}),
+        }
+
+    def chunk_delta(self, chunk: Chunk) -> dict:
+        """A modified chunk's explored cells, and its entities if they differ from the import
+
+        Chunk tiles are never changed after the import, so they are not saved.
+        """
+        data = {"key": [chunk.cx, chunk.cy], "explored": encode_explored(chunk.explored)}
+        if sorted_records(chunk.entities) != sorted_records(
+                import_chunk(self.map_strings, chunk.cx, chunk.cy).entities):
+            data["entities"] = chunk.entities
+        return data
+
+
+@dataclass
+class WindowDelta:
+    """A decoded map delta: the window's layers and entity records, ready to apply
+
+    On a chunked world, chunks are the saved chunks and reset_chunks the
+    imported state of the other chunks modified in the running game.
+    """
+    origin: Tuple[int, int]
+    tile_ids: np.ndarray
+    explored: np.ndarray
+    records: List[dict]
+    chunks: List[Chunk]
+    reset_chunks: List[Chunk]
+
+
+def map_hash(map_strings: List[str]) -> str:
+    """原始地图的内容哈希，标识增量存档的基线"""
+    return hashlib.sha256("\n".join(map_strings).encode("utf-8")).hexdigest()
+
+
+def baseline_window(map_strings: List[str], origin: Tuple[int, int],
+                    size: Tuple[int, int]) -> Tuple[np.ndarray, List[dict]]:
+    """Tile ids and fixture records of a map window as built from the pristine map
+
+    Coordinates are local to the window, matching GameMap; cells outside
+    the text map are void.
+    """
+    origin_x, origin_y = origin
+    width, height = size
+    tile_ids = np.full((width, height), TILE_VOID, dtype=np.uint8)
+    records: List[dict] = []
+    for y in range(max(origin_y, 0), min(origin_y + height, len(map_strings))):
+        row = map_strings[y]
+        left, right = max(origin_x, 0), min(origin_x + width, len(row))
+        if left >= right:
+            continue
+        row_ids, special = parse_map_row(row[left:right])
+        tile_ids[left - origin_x:right - origin_x, y - origin_y] = row_ids
+        for x, char in special:
+            if char in FIXTURE_CHARS:
+                records.append({"object_data": FIXTURE_CHARS[char],
+                                "x": left - origin_x + x, "y": y - origin_y})
+    return tile_ids, records
+
+
+def encode_tiles(tile_ids: np.ndarray, base_tiles: np.ndarray) -> dict:
+    """Tiles that differ from the baseline: flat cell indices and their tile ids, as typed arrays"""
+    cells = np.flatnonzero(tile_ids != base_tiles)
+    return {"cells": encode_array(cells.astype(np.uint32)), "ids": encode_array(tile_ids.flat[cells])}
+
+
+def decode_tiles(data: dict, base_tiles: np.ndarray, tile_count: int) -> np.ndarray:
+    """encode_tiles 的逆操作：在基线地块上应用差异，拒绝越界的格子或地块编号"""
+    cells, ids = decode_array(data["cells"]), decode_array(data["ids"])
+    if cells.ndim != 1 or cells.shape != ids.shape or cells.dtype.kind != "u" or ids.dtype.kind != "u":
+        raise ValueError(f"Saved tile cells {cells.shape} do not match the tile ids {ids.shape}.")
+    if cells.size and (cells.max() >= base_tiles.size or ids.max() >= tile_count):
+        raise ValueError("Invalid tile in save.")
+    tile_ids = base_tiles.copy()
+    tile_ids.flat[cells] = ids
+    return tile_ids
+
+
+def encode_explored(explored: np.ndarray) -> dict:
+    """Explored cells as flat indices while few are explored, bit-packed otherwise"""
+    indices = np.flatnonzero(explored)
+    if len(indices) * 32 < explored.size:  # 32 bits per index vs 1 bit per cell
+        return encode_array(indices.astype(np.uint32))
+    return encode_bits(explored)
+
+
+def decode_explored(data: dict, shape: Tuple[int, int]) -> np.ndarray:
+    """encode_explored 的逆操作"""
+    if "bits" in data:
+        explored = decode_bits(data)
+    else:
+        explored = np.zeros(shape, dtype=bool)
+        explored.flat[decode_array(data)] = True
+    if explored.shape != shape:
+        raise ValueError(f"Saved explored layer {explored.shape} does not match {shape}.")
+    return explored
+
+
+def sorted_records(records: List[dict]) -> List[str]:
+    """Order-independent form of a chunk's entity records, for comparing"""
+    return sorted(json.dumps(record, sort_keys=True) for record in records)
+
+
+def records_by_cell(records: List[dict]) -> Dict[Tuple[str, int, int], List[dict]]:
+    """Records grouped by (object, x, y); only records in the same group can be equal"""
+    groups: Dict[Tuple[str, int, int], List[dict]] = {}
+    for record in records:
+        groups.setdefault((record["object_data"], record["x"], record["y"]), []).append(record)
+    return groups
+
+
+def diff_records(before: List[dict], after: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Records only in before and records only in after
+
+    Fixtures have no saved identity, so records are matched by content,
+    one to one: two equal items on a cell are two records.
+    """
+    unmatched = records_by_cell(before)
+    added = []
+    for record in after:
+        same = unmatched.get((record["object_data"], record["x"], record["y"]))
+        if same and record in same:
+            same.remove(record)
+        else:
+            added.append(record)
+    return [record for same in unmatched.values() for record in same], added
+
+
+def apply_record_diff(before: List[dict], removed: List[dict], added: List[dict]) -> List[dict]:
+    """diff_records 的逆操作：从 before 去掉 removed 中的记录并加入 added"""
+    for record in removed:
+        check_record(record)
+    pending = records_by_cell(removed)
+    records = []
+    for record in before:
+        same = pending.get((record["object_data"], record["x"], record["y"]))
+        if same and record in same:
+            same.remove(record)
+        else:
+            records.append(record)
+    for record in added:
+        check_record(record)
+        records.append(record)
+    return records
+
+
+def entity_record(reference: 'Reference[PhysicalObject]') -> dict:
+    """Compact record of a map entity; fields at their defaults are left out
+
+    Only actors keep their id; fixtures are identified by their record.
+    """
+    record = {"object_data": reference.object_data.id, "x": reference.x, "y": reference.y}
+    object_data = reference.object_data
+    if reference.is_open:
+        record["open"] = True
+    if reference.locked:
+        record["locked"] = True
+    if object_data.object_type == ObjectType.NPC:
+        record["id"] = reference.id
+        record["actor"] = True
+        if reference.mobile is not None:
+            record["hp"] = reference.mobile.hp
+    return record
+
+
+def check_record(record: dict):
+    """Reject an entity record that is missing a required field"""
+    missing = [key for key in RECORD_KEYS if key not in record]
+    if record.get("actor") and "id" not in record:
+        missing.append("id")
+    if missing:
+        raise ValueError(f"Entity record is missing {', '.join(missing)}: {record}")
@@ -0,0 +1,75 @@
+"""均匀网格空间哈希：按位置快速查询地图上的实体"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from config.settings import SPATIAL_HASH_CELL_SIZE
+from entities.game_object import ObjectType
+
+if TYPE_CHECKING:
+    from entities.physical_object import PhysicalObject
+    from entities.reference import Reference
+
+
+class SpatialHash:
+    """把实体Reference按所在的网格桶索引，支持单格查询
+
+    Radius and region lookups go through EntityStore.within_radius and
+    the layer arrays instead.
+    """
+
+    def __init__(self, cell_size: int = SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.buckets: Dict[Tuple[int, int], List['Reference[PhysicalObject]']] = {}
+
+    def bucket_key(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def insert(self, reference: 'Reference[PhysicalObject]'):
+        """按Reference当前位置加入索引"""
+        self.buckets.setdefault(self.bucket_key(reference.x, reference.y), []).append(reference)
+
+    def insert_many(self, references: Iterable['Reference[PhysicalObject]']):
+        buckets, cell_size = self.buckets, self.cell_size
+        for reference in references:
+            key = (reference.x // cell_size, reference.y // cell_size)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [reference]
+            else:
+                bucket.append(reference)
+
+    def remove(self, reference: 'Reference[PhysicalObject]'):
+        """从索引中移除（按Reference当前位置查找）"""
+        key = self.bucket_key(reference.x, reference.y)
+        bucket = self.buckets.get(key, [])
+        # References compare equal to each other (dataclass eq), so match by identity
+        remaining = [ref for ref in bucket if ref is not reference]
+        if remaining:
+            self.buckets[key] = remaining
+        else:
+            self.buckets.pop(key, None)
+
+    def move(self, reference: 'Reference[PhysicalObject]', x: int, y: int):
+        """Re-bucket a reference; call before its x/y are updated"""
+        if self.bucket_key(reference.x, reference.y) == self.bucket_key(x, y):
+            return
+        self.remove(reference)
+        self.buckets.setdefault(self.bucket_key(x, y), []).append(reference)
+
+    def clear(self):
+        self.buckets.clear()
+
+    @staticmethod
+    def matches(reference: 'Reference[PhysicalObject]', object_type: Optional[ObjectType],
+                blocks: Optional[bool]) -> bool:
+        if object_type is not None and reference.object_data.object_type != object_type:
+            return False
+        if blocks is not None and reference.blocks != blocks:
+            return False
+        return True
+
+    def query_point(self, x: int, y: int, object_type: Optional[ObjectType] = None,
+                    blocks: Optional[bool] = None) -> List['Reference[PhysicalObject]']:
+        """获取位于(x, y)的实体"""
+        return [
+            ref for ref in self.buckets.get(self.bucket_key(x, y), [])
+            if ref.x == x and ref.y == y and self.matches(ref, object_type, blocks)
+        ]
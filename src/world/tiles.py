@@ -0,0 +1,52 @@
+"""地块类型编号与地图字符解析
+
+Each cell stores only a small integer tile id; the matching shared Static
+definitions are registered once in the object manager (see data/statics.py).
+"""
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import numpy as np
+from config import WALL, PLAYER
+from data.object_manager import object_manager
+
+if TYPE_CHECKING:
+    from entities.static import Static
+
+
+# 地块类型编号（tile_ids 图层中的取值）
+TILE_VOID = 0
+TILE_FLOOR = 1
+TILE_WALL = 2
+
+# 地块类型编号 -> 注册的Static对象ID
+TILE_OBJECT_IDS = {
+    TILE_FLOOR: "floor",
+    TILE_WALL: "wall",
+}
+
+# 地图字符 -> 放置在该格上的固定实体ID
+FIXTURE_CHARS = {
+    "+": "door",
+}
+
+
+def parse_map_row(row: str) -> Tuple[np.ndarray, List[Tuple[int, str]]]:
+    """解析一行地图字符
+
+    Returns the row's tile ids and the (x, char) pairs of the characters
+    that place something (fixtures or the player start).
+    """
+    codes = np.fromiter(map(ord, row), dtype=np.uint32, count=len(row))
+    tile_ids = np.where(codes == ord(WALL), TILE_WALL, TILE_FLOOR).astype(np.uint8)
+    special = [(x, char) for x, char in enumerate(row) if char in FIXTURE_CHARS or char == PLAYER]
+    return tile_ids, special
+
+
+def get_tile_types() -> List[Optional['Static']]:
+    """按地块编号排列的共享Static定义（TILE_VOID为None）"""
+    tile_types: List[Optional['Static']] = [None] * (max(TILE_OBJECT_IDS) + 1)
+    for tile_id, object_id in TILE_OBJECT_IDS.items():
+        tile = object_manager.get_object(object_id)
+        if tile is None:
+            raise ValueError(f"Tile object '{object_id}' is not registered.")
+        tile_types[tile_id] = tile  # type: ignore[assignment]
+    return tile_types
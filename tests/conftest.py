@@ -0,0 +1,36 @@
+"""Shared fixtures: headless games whose saves and chunks go to a temporary directory"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import pytest  # noqa: E402
+from game import Game, GameState  # noqa: E402
+
+
+def make_game(tmp_path, map_data=None) -> Game:
+    """A headless game in the playing state that saves under tmp_path"""
+    game = Game(headless=True, render=False)
+    game.chunk_store_dir = str(tmp_path / "chunks")
+    if map_data is not None:
+        game.map_data = map_data
+    game.initialize_game()
+    game.change_state(GameState.PLAYING)
+    assert game.save_system is not None
+    game.save_system.save_dir = str(tmp_path / "saves")
+    return game
+
+
+@pytest.fixture
+def game(tmp_path):
+    game = make_game(tmp_path)
+    yield game
+    game.save_system.shutdown()
+
+
+def saved(game: Game, slot: int = 1):
+    """Save to slot and wait for the background write"""
+    assert game.save_system.save_game(slot)
+    game.save_system.wait()
+    return game.save_system.slot_path(slot)
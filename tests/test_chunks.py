@@ -0,0 +1,78 @@
+"""The on-disk chunk store and the chunked world built on it"""
+import io
+
+import numpy as np
+import pytest
+
+from config.settings import CHUNK_SIZE
+from world.chunks import Chunk, ChunkedWorld, ChunkStore, import_chunk
+
+MAP = ["#" * 80] + ["#" + "." * 30 + "+" + "." * 47 + "#" for _ in range(68)] + ["#" * 80]
+MAP[40] = MAP[40][:50] + "@" + MAP[40][51:]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkStore(str(tmp_path / "chunks"))
+
+
+def sample_chunk() -> Chunk:
+    chunk = Chunk(1, 2)
+    chunk.tile_ids[3, 4] = 2
+    chunk.explored[5, 6] = True
+    chunk.entities = [{"object_data": "door", "x": 35, "y": 70}]
+    return chunk
+
+
+def assert_same(a: Chunk, b: Chunk):
+    assert (a.cx, a.cy) == (b.cx, b.cy)
+    assert (a.tile_ids == b.tile_ids).all() and a.tile_ids.dtype == b.tile_ids.dtype
+    assert (a.explored == b.explored).all()
+    assert a.entities == b.entities
+
+
+def test_save_and_load(store):
+    chunk = sample_chunk()
+    chunk.dirty = True
+    store.save(chunk)
+    assert not chunk.dirty
+    assert_same(store.load(1, 2), chunk)
+
+
+def test_raw_bytes_decode_like_a_load(store):
+    store.save(sample_chunk())
+    assert_same(ChunkStore.decode(1, 2, io.BytesIO(store.read_raw(1, 2))), store.load(1, 2))
+
+
+def test_missing_chunk(store):
+    assert store.load(7, 7) is None
+    assert store.read_raw(7, 7) is None
+
+
+def test_clear_removes_only_chunks(store, tmp_path):
+    store.save(sample_chunk())
+    other = tmp_path / "chunks" / "notes.txt"
+    other.write_text("kept")
+    store.clear()
+    assert store.load(1, 2) is None
+    assert other.exists()
+
+
+def test_import_matches_the_stored_chunks(store):
+    world = ChunkedWorld.from_strings(store, MAP)
+    assert world.player_start == (50, 40)
+    for cx in range(-(-80 // CHUNK_SIZE)):
+        for cy in range(-(-70 // CHUNK_SIZE)):
+            assert_same(store.load(cx, cy), import_chunk(MAP, cx, cy))
+
+
+def test_unloaded_chunks_keep_their_changes(store):
+    world = ChunkedWorld.from_strings(store, MAP)
+    world.update_focus(*world.player_start)
+    world.write_explored(0, 0, np.ones((4, 4), dtype=bool))
+    world.update_focus(79 + CHUNK_SIZE * 3, 69 + CHUNK_SIZE * 3)
+    assert (0, 0) not in world.resident
+    assert (0, 0) in world.modified
+    tile_ids, explored = world.read_region(0, 0, 4, 4)
+    assert explored.all()
+    assert (tile_ids == import_chunk(MAP, 0, 0).tile_ids[:4, :4]).all()
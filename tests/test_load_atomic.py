@@ -0,0 +1,61 @@
+"""Loading decodes every section first: a bad section leaves the running game as it was"""
+import copy
+
+import pytest
+
+
+def saved_game_data(game) -> dict:
+    system = game.save_system
+    return copy.deepcopy(system.finish_save_data(system.prepare_save_data())["game"])
+
+
+def state(game):
+    return (
+        (game.player.x, game.player.y),
+        game.player.object_data.inventory.to_dict(),
+        sorted((ref.object_data.id, ref.x, ref.y) for ref in game.world.references),
+        game.world.explored.copy().tobytes(),
+        dict(game.world_state),
+        list(game.message_log.messages),
+    )
+
+
+def break_tiles(data):
+    data["world"]["tiles"]["ids"]["data"] = "not base64!"
+
+
+def break_removed(data):
+    data["world"]["removed"] = [{"x": 1}]
+
+
+def break_player(data):
+    del data["mobile_player"]["x"]
+
+
+def break_log(data):
+    data["message_log"]["recent"] = [["only text"]]
+
+
+def break_baseline(data):
+    data["world"]["baseline"] = "another map"
+
+
+@pytest.mark.parametrize("damage", [break_tiles, break_removed, break_player, break_log, break_baseline])
+def test_bad_section_leaves_the_game_unchanged(game, damage):
+    data = saved_game_data(game)
+    damage(data)
+    game.step("right")
+    game.add_message("played on")
+    before = state(game)
+    with pytest.raises((KeyError, TypeError, ValueError)):
+        game.from_dict(data)
+    assert state(game) == before
+
+
+def test_good_save_is_applied(game):
+    data = saved_game_data(game)
+    start = (game.player.x, game.player.y)
+    game.step("right")
+    game.from_dict(data)
+    assert (game.player.x, game.player.y) == start
+
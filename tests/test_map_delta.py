@@ -0,0 +1,127 @@
+"""Map deltas: entity identity and the round trip through a save"""
+import numpy as np
+import pytest
+
+from bench.scenarios import BENCH_ITEM_ID, Scenario, generate_map, register_bench_objects
+from conftest import make_game, saved
+from core.array_codec import encode_array
+
+OPEN_MAP = Scenario("open", 200, 200, wall_density=0.0, door_density=0.0)
+
+
+def items_at(game, x, y):
+    return [ref for ref in game.world.entity_index.query_point(x, y)
+            if ref.object_data.id == BENCH_ITEM_ID]
+
+
+@pytest.fixture
+def chunked_game(tmp_path):
+    game = make_game(tmp_path, generate_map(OPEN_MAP))
+    register_bench_objects()  # after the game registered its own objects
+    yield game
+    game.save_system.shutdown()
+
+
+def test_stacked_items_in_a_chunk_load(chunked_game):
+    world = chunked_game.world
+    x, y = chunked_game.player.x + 2, chunked_game.player.y
+    for _ in range(2):
+        world.chunked_world.add_entity({"object_data": BENCH_ITEM_ID,
+                                        "x": x + world.origin[0], "y": y + world.origin[1]})
+    world.load_window(*world.origin)
+    assert len(items_at(chunked_game, x, y)) == 2
+
+
+def test_stacked_items_survive_a_save(game):
+    register_bench_objects()
+    x, y = game.player.x + 1, game.player.y + 1
+    record = {"object_data": BENCH_ITEM_ID, "x": x, "y": y}
+    game.world.add_records([record, dict(record), dict(record)])
+    game.world.remove_reference(items_at(game, x, y)[0])
+    saved(game)
+    for ref in items_at(game, x, y):
+        game.world.remove_reference(ref)
+    assert game.save_system.load_game(1)
+    assert len(items_at(game, x, y)) == 2
+
+
+def test_fixture_ids_do_not_depend_on_position(game):
+    ids = [ref.id for ref in game.world.references if ref.id != "player"]
+    assert len(set(ids)) == len(ids)
+    assert all("_" not in entity_id.rsplit("#", 1)[-1] for entity_id in ids)
+
+
+DOOR_MAP = [
+    "#######",
+    "#.@.+.#",
+    "#.....#",
+    "#...+.#",
+    "#######",
+]
+
+
+@pytest.fixture
+def door_game(tmp_path):
+    game = make_game(tmp_path, DOOR_MAP)
+    yield game
+    game.save_system.shutdown()
+
+
+def doors(game):
+    return {(ref.x, ref.y): ref for ref in game.world.references if ref.object_data.id == "door"}
+
+
+def test_opening_a_door_leaves_the_others_closed(door_game):
+    door_game.step("right")
+    door_game.step("right")
+    opened, closed = doors(door_game)[(4, 1)], doors(door_game)[(4, 3)]
+    assert opened.object_data is closed.object_data
+    assert opened.is_open and not opened.blocks
+    assert not closed.is_open and closed.blocks
+    assert door_game.world.is_blocked(4, 3)
+
+
+def test_open_door_survives_a_save(door_game):
+    door_game.step("right")
+    door_game.step("right")
+    saved(door_game)
+    door_game.world.reset_door()
+    assert door_game.save_system.load_game(1)
+    assert doors(door_game)[(4, 1)].is_open
+    assert not doors(door_game)[(4, 3)].is_open
+    assert door_game.world.is_blocked(4, 3)
+
+
+def round_trip(game):
+    world = game.world
+    delta = world.snapshot(game.map_data).to_delta()
+    return delta, world.decode_delta(delta, game.map_data)
+
+
+def test_changed_tiles_round_trip_as_typed_arrays(game):
+    world = game.world
+    world.tile_ids[1, 1] = world.tile_ids[0, 0]
+    world.tile_ids[5, 2] = world.tile_ids[0, 0]
+    delta, decoded = round_trip(game)
+    assert set(delta["tiles"]) == {"cells", "ids"}
+    assert delta["tiles"]["cells"]["dtype"] == "<u4"
+    assert (decoded.tile_ids == world.tile_ids).all()
+    assert (decoded.explored == world.explored).all()
+
+
+def test_unchanged_map_has_an_empty_tile_delta(game):
+    _, decoded = round_trip(game)
+    assert (decoded.tile_ids == game.world.tile_ids).all()
+
+
+@pytest.mark.parametrize("cells, ids", [
+    (np.array([10 ** 6], dtype=np.uint32), np.array([0], dtype=np.uint8)),
+    (np.array([0], dtype=np.uint32), np.array([250], dtype=np.uint8)),
+    (np.array([0, 1], dtype=np.uint32), np.array([0], dtype=np.uint8)),
+    (np.array([0], dtype=np.int32), np.array([-1], dtype=np.int8)),
+])
+def test_invalid_tiles_are_rejected(game, cells, ids):
+    delta, _ = round_trip(game)
+    delta["tiles"] = {"cells": encode_array(cells), "ids": encode_array(ids)}
+    with pytest.raises(ValueError):
+        game.world.decode_delta(delta, game.map_data)
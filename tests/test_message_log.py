@@ -0,0 +1,64 @@
+"""The message history file: lifetime per game, no duplicates on load, bounded size"""
+import pytest
+
+import ui.messasge_log as messasge_log
+from conftest import saved
+from ui import MessageLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = MessageLog(font=None, char_size=(8, 16), history_path=str(tmp_path / "history.log"))
+    yield log
+    log.close()
+
+
+def all_lines(log: MessageLog):
+    return [text for text, _ in log.get_lines(log.first_line, log.total_lines)]
+
+
+def test_history_pages_old_lines_from_disk(log):
+    for i in range(log.max_lines * 2):
+        log.add_message(f"line {i}")
+    assert all_lines(log) == [f"line {i}" for i in range(log.max_lines * 2)]
+
+
+def test_history_starts_empty(tmp_path):
+    path = str(tmp_path / "history.log")
+    first = MessageLog(font=None, char_size=(8, 16), history_path=path)
+    first.add_message("from the last session")
+    first.close()
+    second = MessageLog(font=None, char_size=(8, 16), history_path=path)
+    assert second.total_lines == 0
+    second.close()
+
+
+def test_restore_replaces_history(log):
+    for i in range(log.max_lines * 2):
+        log.add_message(f"played {i}")
+    log.restore_lines([("saved a", (1, 2, 3)), ("saved b", (4, 5, 6))])
+    assert all_lines(log) == ["saved a", "saved b"]
+    log.restore_lines(MessageLog.decode_lines(log.to_dict()))
+    assert all_lines(log) == ["saved a", "saved b"]
+
+
+def test_history_is_rotated(log, monkeypatch):
+    monkeypatch.setattr(messasge_log, "MESSAGE_HISTORY_MAX_LINES", 200)
+    for i in range(1000):
+        log.add_message(f"line {i}")
+    assert len(log.offsets) <= 200
+    lines = all_lines(log)
+    assert lines == [f"line {i}" for i in range(1000 - len(lines), 1000)]
+    assert log.scroll_offset >= log.first_line
+
+
+def test_load_does_not_duplicate_messages(game, tmp_path):
+    game.message_log.close()
+    game.message_log = MessageLog(font=None, char_size=(8, 16), history_path=str(tmp_path / "history.log"))
+    game.add_message("before the save")
+    saved(game)
+    game.add_message("after the save")
+    assert game.save_system.load_game(1)
+    assert all_lines(game.message_log).count("before the save") == 1
+    assert "after the save" not in all_lines(game.message_log)
+    game.message_log.close()
@@ -0,0 +1,38 @@
+"""Which events mark the screen out of date"""
+import pygame
+import pytest
+
+from core.save_load import SAVE_COMPLETE_EVENT
+from game import GameState
+
+
+def redraws(game, event) -> bool:
+    game.needs_redraw = False
+    game._drawn_log_revision = game.message_log.revision
+    game.handle_events([event])
+    return game.is_dirty()
+
+
+@pytest.mark.parametrize("event", [
+    pygame.event.Event(pygame.KEYUP, key=pygame.K_RIGHT),
+    pygame.event.Event(pygame.WINDOWFOCUSGAINED),
+    pygame.event.Event(pygame.WINDOWFOCUSLOST),
+    pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(0, 0)),
+    pygame.event.Event(SAVE_COMPLETE_EVENT),
+])
+def test_events_that_change_nothing_do_not_redraw(game, event):
+    assert not redraws(game, event)
+
+
+@pytest.mark.parametrize("event", [
+    pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RIGHT),
+    pygame.event.Event(pygame.WINDOWEXPOSED),
+])
+def test_input_and_exposure_redraw(game, event):
+    assert redraws(game, event)
+
+
+def test_finished_save_redraws_the_save_browser(game):
+    game.change_state(GameState.SAVE_MENU)
+    assert redraws(game, pygame.event.Event(SAVE_COMPLETE_EVENT))
+
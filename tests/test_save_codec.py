@@ -0,0 +1,49 @@
+"""Save codecs: every JSON backend and compression round-trips and is read back from the header"""
+import pytest
+
+from core.save_codec import COMPRESSIONS, JSON_CODECS, SaveCodec, fast_json_available
+
+VALUE = {
+    "slot": 1,
+    "text": "Wanderer greets Ålva ☕",
+    "numbers": [0, -1, 2 ** 40, 1.5],
+    "nested": {"flags": [True, False, None], "empty": {}},
+}
+
+CODECS = [
+    pytest.param(name, marks=pytest.mark.skipif(name == "orjson" and not fast_json_available(),
+                                                  reason="orjson is not installed"))
+    for name in JSON_CODECS
+]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("name", CODECS)
+def test_round_trip(name, compression):
+    codec = SaveCodec(name, compression)
+    assert codec.decode(codec.encode(VALUE)) == VALUE
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("name", CODECS)
+def test_header_selects_a_codec_that_reads_the_data(name, compression):
+    data = SaveCodec(name, compression).encode(VALUE)
+    assert SaveCodec.from_header(SaveCodec(name, compression).describe()).decode(data) == VALUE
+
+
+def test_header_without_codec_is_plain_json():
+    codec = SaveCodec.from_header({})
+    assert (codec.name, codec.compression) == ("json", "none")
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+def test_damaged_compressed_data_raises_value_error(compression):
+    data = SaveCodec("compact", compression).encode(VALUE)
+    with pytest.raises(ValueError):
+        SaveCodec("compact", compression).decode(data[: len(data) // 2])
+
+
+@pytest.mark.parametrize("name, compression", [("yaml", "none"), ("compact", "bz2")])
+def test_unknown_codec_is_rejected(name, compression):
+    with pytest.raises(ValueError):
+        SaveCodec(name, compression)
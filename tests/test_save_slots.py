@@ -0,0 +1,70 @@
+"""Slot browser and load checks on damaged save files"""
+import os
+from conftest import saved
+
+
+def slot_info(game, slot):
+    return next(info for info in game.save_system.list_slots() if info["slot"] == slot)
+
+
+def test_intact_slot_lists_and_loads(game):
+    saved(game, 1)
+    info = slot_info(game, 1)
+    assert not info["empty"] and not info.get("corrupt")
+    assert game.save_system.load_game(1)
+
+
+def test_truncated_slot_is_marked_corrupt(game):
+    path = saved(game, 1)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    assert slot_info(game, 1)["corrupt"]
+    assert not game.save_system.load_game(1)
+    assert game.message_log.messages[-1][0] == "Save slot 1 is corrupted."
+
+
+def test_flipped_byte_fails_checksum(game):
+    path = saved(game, 1)
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    data[-5] ^= 1
+    with open(path, "wb") as f:
+        f.write(data)
+
+    assert not game.save_system.load_game(1)
+    assert slot_info(game, 1)["corrupt"]
+
+
+def test_unindexed_garbage_slot_is_listed_corrupt(game):
+    os.makedirs(game.save_system.save_dir, exist_ok=True)
+    with open(game.save_system.slot_path(2), "wb") as f:
+        f.write(b"garbage\x00\x01")
+
+    assert slot_info(game, 2)["corrupt"]
+    assert not game.save_system.load_game(2)
+
+
+def test_unindexed_truncated_slot_fails_cleanly(game):
+    path = saved(game, 1)
+    os.remove(game.save_system.metadata_path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    assert not game.save_system.load_game(1)
+    assert game.message_log.messages[-1][0] == "Error loading game."
+
+
+def test_saving_again_clears_the_corrupt_mark(game):
+    path = saved(game, 1)
+    with open(path, "ab") as f:
+        f.write(b"junk")
+    assert slot_info(game, 1)["corrupt"]
+
+    saved(game, 1)
+    assert not slot_info(game, 1).get("corrupt")
+    assert game.save_system.load_game(1)
@@ -0,0 +1,90 @@
+"""Save snapshots: taken on the main thread, finished on the worker"""
+import pygame
+import pytest
+from bench.scenarios import Scenario, generate_map
+from conftest import make_game, saved
+from core.save_load import SAVE_COMPLETE_EVENT
+
+OPEN_MAP = Scenario("open", 200, 200, wall_density=0.0, door_density=0.0)
+
+
+@pytest.fixture
+def chunked_game(tmp_path):
+    game = make_game(tmp_path, generate_map(OPEN_MAP))
+    assert game.world.chunked_world is not None
+    yield game
+    game.save_system.shutdown()
+
+
+def walk(game, moves):
+    for action, count in moves:
+        for _ in range(count):
+            game.step(action)
+
+
+def test_snapshot_is_not_affected_by_later_play(chunked_game):
+    walk(chunked_game, [("right", 100)])
+    system = chunked_game.save_system
+    expected = system.finish_save_data(system.prepare_save_data())["game"]["world"]
+
+    snapshot = system.prepare_save_data()
+    # Walking back a few rows lower explores more of the stored chunks
+    # and overwrites their files before the snapshot is read
+    walk(chunked_game, [("down", 5), ("left", 100), ("down", 80)])
+    assert system.finish_save_data(snapshot)["game"]["world"] == expected
+
+
+def test_snapshot_does_not_touch_the_chunk_store(chunked_game, monkeypatch):
+    walk(chunked_game, [("right", 60)])
+    store = chunked_game.world.chunked_world.store
+
+    def forbidden(*args):
+        raise AssertionError("chunk store accessed while taking a snapshot")
+    monkeypatch.setattr(store, "save", forbidden)
+    monkeypatch.setattr(store, "load", forbidden)
+    monkeypatch.setattr(store, "read_raw", forbidden)
+    chunked_game.save_system.prepare_save_data()
+
+
+def test_off_window_progress_survives_a_new_game(chunked_game, tmp_path):
+    walk(chunked_game, [("right", 60), ("down", 40), ("left", 20)])
+    saved(chunked_game)
+    world = chunked_game.world
+    explored = world.explored.copy()
+    world.store_window()
+    world.chunked_world.flush()
+    expected = sum(int(chunk.explored.sum()) for chunk in world.chunked_world.snapshot(
+        world.origin, world.explored, world.fixture_records()).read())
+
+    # A new game clears the chunk store
+    game = make_game(tmp_path, generate_map(OPEN_MAP))
+    assert game.save_system.load_game(1)
+    loaded = game.world
+    assert (loaded.explored == explored).all()
+    restored = loaded.chunked_world.snapshot(loaded.origin, loaded.explored, loaded.fixture_records()).read()
+    assert sum(int(chunk.explored.sum()) for chunk in restored) == expected
+
+
+def test_unwritable_snapshot_reports_an_error(game, monkeypatch):
+    def fail():
+        raise OSError("disk full")
+    monkeypatch.setattr(game, "snapshot", fail)
+    assert not game.save_system.save_game(1)
+    assert game.message_log.messages[-1][0] == "Error saving game."
+
+
+def test_listing_slots_while_saving_never_marks_them_corrupt(game):
+    system = game.save_system
+    for _ in range(20):
+        system.save_game(1)
+        assert not any(info.get("corrupt") for info in system.list_slots())
+    system.wait()
+    assert system.load_game(1)
+
+
+def test_headless_saves_do_not_queue_events(game):
+    assert pygame.display.get_init()
+    pygame.event.clear()
+    for _ in range(3):
+        saved(game)
+    assert pygame.event.get(SAVE_COMPLETE_EVENT) == []
@@ -0,0 +1,52 @@
+"""Saves from other versions are listed as incompatible and never applied"""
+import json
+import os
+import pytest
+from config import CURRENT_VERSION
+from core.save_slot import SlotFile, encode_slot
+from conftest import saved
+
+
+def slot_info(game, slot):
+    return next(info for info in game.save_system.list_slots() if info["slot"] == slot)
+
+
+def test_current_saves_are_compatible(game):
+    saved(game, 1)
+    info = slot_info(game, 1)
+    assert info["version"] == CURRENT_VERSION and not info["incompatible"]
+
+
+def test_whole_file_save_is_listed_incompatible_and_refused(game):
+    os.makedirs(game.save_system.save_dir, exist_ok=True)
+    with open(game.save_system.slot_path(2), "w", encoding="utf-8") as f:
+        json.dump({"version": "1.0", "timestamp": "2025-09-20T21:26:00",
+                   "game": {"world": {"explored": [[True]]}, "world_state": {"day": 3}}}, f, indent=2)
+
+    info = slot_info(game, 2)
+    assert info["incompatible"] and info["version"] == "1.0" and info["day"] == 3
+    player = (game.player.x, game.player.y)
+    assert not game.save_system.load_game(2)
+    assert game.message_log.messages[-1][0] == "Save slot 2 is from an incompatible version (1.0)."
+    assert (game.player.x, game.player.y) == player
+
+
+def test_sectioned_save_from_another_version_is_refused(game):
+    system = game.save_system
+    save_data = system.finish_save_data(system.prepare_save_data())
+    save_data["version"] = "9.9"
+    os.makedirs(system.save_dir, exist_ok=True)
+    with open(system.slot_path(3), "wb") as f:
+        f.write(encode_slot(save_data, system.codec))
+
+    assert slot_info(game, 3)["incompatible"]
+    assert not system.load_game(3)
+
+
+def test_whole_file_save_sections_are_not_readable(game, tmp_path):
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps({"version": "1.0", "game": {}}), encoding="utf-8")
+    slot_file = SlotFile(str(path))
+    assert slot_file.legacy and slot_file.header["version"] == "1.0"
+    with pytest.raises(ValueError):
+        slot_file.section("world")
@@ -0,0 +1,50 @@
+"""Serializable: declared fields, inherited plans and the field kinds"""
+from core.serializable import serialization_plan
+from entities import MobilePlayer, Player, Reference
+from entities.door import Door
+from entities.game_object import ObjectType
+
+
+def test_plan_lists_base_fields_first_and_is_cached():
+    names = [name for name, _ in serialization_plan(Door)]
+    assert names[:2] == ["id", "object_type"]
+    assert {"blocks", "interactable", "char", "close_char", "open_char"} <= set(names)
+    assert serialization_plan(Door) is serialization_plan(Door)
+
+
+def test_door_round_trip():
+    door = Door("door", "Oak door", color=(1, 2, 3))
+    data = door.to_dict()
+    assert data["object_type"] == "DOOR" and data["color"] == (1, 2, 3)
+
+    copy = Door("other", "Other")
+    copy.from_dict(data)
+    assert copy.to_dict() == data
+    assert copy.object_type is ObjectType.DOOR
+    assert copy.color == (1, 2, 3)
+
+
+def test_mobile_player_round_trip():
+    reference = Reference("player", 4, 5, object_data=Player())
+    mobile = MobilePlayer(4, 5, reference)
+    mobile.hp = 7
+    mobile.skills = {"alchemy": 2}
+    mobile.object_data.inventory.add_item("lemon", 3)
+    data = mobile.to_dict()
+    assert data["reference"] == "player"
+
+    other = Reference("player", 0, 0, object_data=Player())
+    restored = MobilePlayer(0, 0, other)
+    restored.from_dict(data, {"player": other}.__getitem__)
+    assert (restored.x, restored.y, restored.hp) == (4, 5, 7)
+    assert restored.skills == {"alchemy": 2}
+    assert restored.object_data.inventory.to_dict() == mobile.object_data.inventory.to_dict()
+    assert restored.reference is other
+
+
+def test_missing_fields_keep_their_values():
+    reference = Reference("player", 1, 2, object_data=Player())
+    mobile = MobilePlayer(1, 2, reference)
+    mobile.from_dict({"hp": 3})
+    assert (mobile.x, mobile.y, mobile.hp) == (1, 2, 3)
+    assert mobile.reference is reference